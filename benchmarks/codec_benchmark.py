@@ -0,0 +1,83 @@
+"""Compares the pure Python and libyaml codecs on a synthetic list.
+
+Usage: python -m benchmarks.codec_benchmark [items]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import yaml
+
+from storage.codec import LIBYAML, dump_yaml, load_yaml
+
+
+def synthetic_item(number: int) -> dict:
+    """Returns an item shaped like one created from a four field template."""
+    return {
+        "Name": f"Item number {number}",
+        "Amount": str(number * 7 % 1000),
+        "Due": f"2024-{number % 12 + 1:02d}-{number % 28 + 1:02d}",
+        "Category": ["Home", "Work", "Errands"][number % 3],
+        "checked": number % 4 == 0,
+    }
+
+
+def time_it(func, paths) -> float:
+    """Returns the seconds spent running func over all paths."""
+    start = time.perf_counter()
+    for path in paths:
+        func(path)
+    return time.perf_counter() - start
+
+
+def main(count: int = 10000):
+    """Runs the benchmark."""
+    if not LIBYAML:
+        print("PyYAML was built without libyaml, nothing to compare.")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"{n}.yaml") for n in range(count)]
+        items = {path: synthetic_item(n) for n, path in enumerate(paths)}
+
+        def dump_with(dumper):
+            def dump(path):
+                with open(path, "w", encoding="utf-8") as file:
+                    dump_yaml(items[path], file, dumper=dumper)
+
+            return dump
+
+        def load_with(loader):
+            def load(path):
+                with open(path, encoding="utf-8") as file:
+                    load_yaml(file, loader=loader)
+
+            return load
+
+        for path, item in items.items():
+            with open(path, "w", encoding="utf-8") as file:
+                dump_yaml(item, file)
+
+        results = {
+            "load": (
+                time_it(load_with(yaml.SafeLoader), paths),
+                time_it(load_with(yaml.CSafeLoader), paths),
+            ),
+            "dump": (
+                time_it(dump_with(yaml.SafeDumper), paths),
+                time_it(dump_with(yaml.CSafeDumper), paths),
+            ),
+        }
+
+    print(f"{count} items")
+    for name, (pure, accelerated) in results.items():
+        print(
+            f"{name}: python {pure:.3f}s, libyaml {accelerated:.3f}s, "
+            f"speedup {pure / accelerated:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
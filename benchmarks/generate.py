@@ -0,0 +1,105 @@
+"""Generates synthetic Documents/Lister trees for the benchmarks.
+
+Each list gets a template with Text, Number, Date and Category fields and
+items named like the app names them, some of them in the list archive.
+
+Usage: python -m benchmarks.generate root [items] [lists]
+"""
+
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+from storage.codec import dump_yaml
+
+CATEGORIES = ("Home", "Work", "Errands", "Health", "Travel")
+WORDS = ("buy", "call", "fix", "plan", "read", "send", "check", "book", "pay", "clean")
+START = datetime(2020, 1, 1)
+
+
+def tree_paths(root: str) -> dict:
+    """Returns the folders of a generated tree, as laid out by the app."""
+    return {
+        "lists": os.path.join(root, "lists"),
+        "archives": os.path.join(root, "archives"),
+        "templates": os.path.join(root, "templates"),
+        "exports": os.path.join(root, "exports"),
+    }
+
+
+def template(list_name: str) -> dict:
+    """Returns the template of a synthetic list."""
+    return {
+        list_name: [
+            {"field_name": "Title", "type": "Text"},
+            {"field_name": "Amount", "type": "Number"},
+            {"field_name": "Due", "type": "Date"},
+            {"field_name": "Category", "type": "Category", "categories": list(CATEGORIES)},
+            {"field_name": "Notes", "type": "Text"},
+        ]
+    }
+
+
+def synthetic_item(rng: random.Random, number: int) -> dict:
+    """Returns an item as the new item screen saves it, values as text."""
+    due = START + timedelta(days=rng.randrange(2000))
+    return {
+        "Title": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {number}",
+        "Amount": str(rng.randrange(100000) / 100),
+        "Due": due.strftime("%Y-%m-%d"),
+        "Category": rng.choice(CATEGORIES),
+        "Notes": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(12))),
+        "checked": rng.random() < 0.3,
+    }
+
+
+def generate_tree(
+    root: str,
+    items: int = 1000,
+    lists: int = 1,
+    archived: float = 0.2,
+    seed: int = 0,
+) -> list:
+    """
+    Summary:
+    Writes a synthetic tree of lists, archives and templates.
+
+    Parameters:
+    - root (str): The folder standing in for Documents/Lister.
+    - items (int): The number of items per list, live and archived.
+    - lists (int): The number of lists.
+    - archived (float): The fraction of items written to the archive.
+    - seed (int): The random seed, so runs generate the same tree.
+
+    Returns:
+    The list names.
+    """
+    rng = random.Random(seed)
+    paths = tree_paths(root)
+    for path in paths.values():
+        os.makedirs(path, exist_ok=True)
+
+    names = [f"List{number}" for number in range(lists)]
+    for list_name in names:
+        with open(
+            os.path.join(paths["templates"], f"{list_name}.yaml"), "w", encoding="utf-8"
+        ) as file:
+            dump_yaml(template(list_name), file)
+        for folder in ("lists", "archives"):
+            os.makedirs(os.path.join(paths[folder], list_name), exist_ok=True)
+        for number in range(items):
+            stamp = (START + timedelta(seconds=number * 37)).strftime("%Y-%m-%d %H%M%S")
+            folder = "archives" if rng.random() < archived else "lists"
+            path = os.path.join(paths[folder], list_name, f"{list_name}_{stamp}.yaml")
+            with open(path, "w", encoding="utf-8") as file:
+                dump_yaml(synthetic_item(rng, number), file)
+    return names
+
+
+if __name__ == "__main__":
+    generate_tree(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 1,
+    )
@@ -0,0 +1,268 @@
+"""Times the logic behind the list, table, export and rename actions.
+
+Generates a synthetic tree per size (see benchmarks.generate) and times
+what the screens do apart from drawing widgets: opening a list cold and
+warm, building and sorting the table, every export format, the newest
+first file order, the first page of a filter, reading a new item form and
+renaming a list. The form
+case builds real widgets with the mock GL backend and is skipped when Kivy
+is not installed. Results, with the instrumentation counters of each run,
+are written as JSON so runs can be compared.
+
+Usage: python -m benchmarks.view_benchmark [items ...] [--repeat n]
+       [--output path] [--keep root]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+from benchmarks.generate import generate_tree, tree_paths
+from storage import metrics
+from storage.codec import LIBYAML
+from storage.export import (
+    export_csv,
+    export_records,
+    scan_fields,
+    template_fields,
+)
+from storage.index import INDEX_FILENAME, forget_directory
+from storage.listing import LISTINGS, newest_first, sorted_item_names
+from storage.log_store import export_yaml
+from storage.query import Query
+from storage.records import ItemRow
+from storage.repository import Repository, template_field_types
+from storage.table import TableModel
+
+DEFAULT_SIZES = (1000, 10000)
+PAGE_SIZE = 50
+# Rows a TableView shows at once, the only ones whose cells get formatted.
+VISIBLE_ROWS = 20
+# A filter the list index answers, and one needing the item files.
+INDEX_FILTER = "checked == False"
+FIELD_FILTER = "checked == False and Category in {Home, Work} and Due < today"
+
+
+class Skipped(Exception):
+    """Raised by a case that cannot run here."""
+
+
+def time_case(func, repeat: int) -> dict:
+    """Runs func repeat times, returning the timings in seconds."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return {
+        "seconds": seconds,
+        "min": min(seconds),
+        "mean": sum(seconds) / len(seconds),
+    }
+
+
+def list_rows(directory: str, page: dict) -> list:
+    """Builds the list view rows of a page, as ItemsScreen.add_page does."""
+    rows = [
+        ItemRow(directory, name, entry.headline, entry.checked)
+        for name, entry in page.items()
+    ]
+    return sorted(rows, key=lambda x: x["checked"])
+
+
+def open_list(repository: Repository, list_name: str) -> None:
+    """Loads every page of a list, as the list view streams it in."""
+    directory = repository.list_dir(list_name)
+    rows = []
+    for page in repository.entry_pages(list_name, PAGE_SIZE):
+        rows = list_rows(directory, page) + rows
+
+
+def drop_index(repository: Repository, list_name: str) -> None:
+    """Forgets the list index in memory and on disk, for a cold open."""
+    directory = repository.list_dir(list_name)
+    forget_directory(directory)
+    LISTINGS.forget(directory)
+    index_path = os.path.join(directory, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+
+def build_table(repository: Repository, list_name: str) -> None:
+    """Loads and sorts the table by every column, as ItemsScreen does."""
+    directory = repository.list_dir(list_name)
+    fields = template_field_types(repository.template_path(list_name))
+    model = TableModel(fields)
+    model.load(directory, repository.entries(list_name))
+    for column in model.columns:
+        data = model.view_data(column)
+        _cells = [row["cells"] for row in data[:VISIBLE_ROWS]]
+
+
+def read_form(list_name: str, repository: Repository):
+    """Returns a function reading a filled new item form, needing Kivy."""
+    os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    os.environ.setdefault("KIVY_NO_FILELOG", "1")
+    try:
+        # pylint: disable=C0415
+        from kivy.app import App
+        from kivy.lang import Builder
+        from kivymd.app import MDApp
+
+        from components.forms import NewItemForm
+        from utils import list_items_to_dict
+
+        app = MDApp()
+        # Widgets read the theme from the running app, which is never run here.
+        App._running_app = app  # pylint: disable=protected-access
+        Builder.load_file(os.path.join(os.path.dirname(__file__), "..", "main.kv"))
+        forms = []
+        for field in repository.read_template(list_name).fields:
+            form = NewItemForm()
+            form.ids.helper_text.text = field.name
+            form.ids.new_field_value.text = f"{field.type} value"
+            forms.append(form)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        raise Skipped(f"{type(e).__name__}: {e}") from e
+
+    def read():
+        for _ in range(1000):
+            list_items_to_dict(forms)
+
+    return read
+
+
+def run_size(root: str, items: int, repeat: int) -> dict:
+    """Generates a tree of the given size and times every case on it."""
+    start = time.perf_counter()
+    (list_name,) = generate_tree(root, items)
+    generated = time.perf_counter() - start
+    paths = tree_paths(root)
+    repository = Repository(paths["lists"], paths["archives"], paths["templates"])
+    directory = repository.list_dir(list_name)
+    names = repository.item_names(list_name)
+    template_path = repository.template_path(list_name)
+
+    def cold_open():
+        drop_index(repository, list_name)
+        open_list(repository, list_name)
+
+    def first_page():
+        drop_index(repository, list_name)
+        next(repository.entry_pages(list_name, PAGE_SIZE))
+
+    fields = template_field_types(template_path)
+
+    def filter_first_page(text):
+        query = Query(text, fields)
+        return lambda: next(repository.filter_pages(list_name, query, PAGE_SIZE), {})
+
+    def export_to(export_format):
+        def export():
+            if export_format == "csv":
+                fieldnames = scan_fields(directory, names, template_fields(template_path))
+                export_csv(
+                    directory,
+                    names,
+                    os.path.join(paths["exports"], list_name),
+                    fieldnames,
+                )
+            elif export_format == "yaml":
+                export_yaml(directory, names, os.path.join(paths["exports"], "yaml"))
+            else:
+                export_records(
+                    directory, template_path, paths["exports"], list_name, export_format
+                )
+
+        return export
+
+    def rename():
+        repository.rename_list(list_name, f"{list_name}_renamed")
+        repository.rename_list(f"{list_name}_renamed", list_name)
+
+    cases = {
+        "list_open_first_page_cold": first_page,
+        "list_open_cold": cold_open,
+        "list_open_warm": lambda: open_list(repository, list_name),
+        "table_build": lambda: build_table(repository, list_name),
+        "export_csv": export_to("csv"),
+        "export_jsonl": export_to("jsonl"),
+        "export_columnar": export_to("columnar"),
+        "export_yaml": export_to("yaml"),
+        "filter_first_page_index": filter_first_page(INDEX_FILTER),
+        "filter_first_page_fields": filter_first_page(FIELD_FILTER),
+        "sort_files_by_datetime": lambda: newest_first(names),
+        "sort_files_cached": lambda: sorted_item_names(directory),
+        "rename_list_twice": rename,
+    }
+
+    results = {}
+    for name, func in cases.items():
+        metrics.reset()
+        results[name] = time_case(func, repeat)
+        results[name]["metrics"] = metrics.snapshot()["counters"]
+    try:
+        results["list_items_to_dict_x1000"] = time_case(
+            read_form(list_name, repository), repeat
+        )
+    except Skipped as e:
+        results["list_items_to_dict_x1000"] = {"skipped": str(e)}
+
+    return {
+        "items": items,
+        "live_items": len(names),
+        "generate_seconds": generated,
+        "cases": results,
+    }
+
+
+def main(argv=None):
+    """Runs the benchmark and writes the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("items", nargs="*", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="view_benchmark.json")
+    parser.add_argument("--keep", help="generate the trees under this folder")
+    args = parser.parse_args(argv)
+
+    metrics.enable()
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "libyaml": LIBYAML,
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    for items in args.items:
+        root = (
+            os.path.join(args.keep, str(items)) if args.keep else tempfile.mkdtemp()
+        )
+        try:
+            run = run_size(root, items, args.repeat)
+        finally:
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+        report["runs"].append(run)
+        print(f"{items} items ({run['live_items']} live)")
+        for name, result in run["cases"].items():
+            if "skipped" in result:
+                print(f"  {name}: skipped ({result['skipped']})")
+            else:
+                print(f"  {name}: {result['min'] * 1000:.1f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,5 @@
 """Custom Dialogs classes"""
 
-import os
-import yaml
-
 from kivymd.uix.dialog import MDDialog
 
 
@@ -10,14 +7,40 @@ from kivymd.uix.dialog import MDDialog
 class SearchDialog(MDDialog):
     """Search dialog box."""
 
-    def open_search_dialog(self, container):
-        """Opens the search dialog."""
+    def open_search_dialog(self, container, search_fn=None):
+        """Opens the search dialog.
+
+        If search_fn is given, it is called with the query and a callback
+        taking its results, which replace the container data, instead of
+        filtering what is shown.
+        """
+
+        def show_results(search_results):
+            if search_results:
+                container.data = search_results
 
         def search_callback(_):
+            query = self.ids.search_field.text.lower()
+
+            if search_fn is not None:
+                search_fn(query, show_results)
+                self.dismiss_dialog(_)
+                return
+
+            # Virtualized views are filtered on their data, not on widgets.
+            if hasattr(container, "data"):
+                search_results = [
+                    item for item in container.data if query in item["text"].lower()
+                ]
+                if search_results:
+                    container.data = search_results
+                self.dismiss_dialog(_)
+                return
+
             search_results = [
                 item
                 for item in container.children
-                if self.ids.search_field.text.lower() in item.ids.headline.text.lower()
+                if query in item.ids.headline.text.lower()
             ]
 
             if search_results:
@@ -40,35 +63,39 @@ class SearchDialog(MDDialog):
 class RenameDialog(MDDialog):
     """Rename List dialog box."""
 
-    def open_rename_dialog(self, title, templates_path, lists_path, archives_path):
-        """Opens the search dialog."""
+    def open_rename_dialog(self, title, rename_fn):
+        """Opens the rename dialog. rename_fn is called with the old and new
+        names, after the title was updated."""
 
         def rename_callback(_):
             old_name = title.text
-            old_template = os.path.join(templates_path, f"{old_name}.yaml")
-            old_list = os.path.join(lists_path, old_name)
-            old_archive = os.path.join(archives_path, old_name)
-
-            with open(old_template, encoding="utf-8") as file:
-                template = yaml.safe_load(file)
             title.text = self.ids.rename_field.text
-            template[title.text] = template.pop(old_name)
+            rename_fn(old_name, title.text)
+            self.dismiss_dialog(_)
+
+        self.ids.cancel_btn.bind(on_release=self.dismiss_dialog)
+        self.ids.rename_btn.bind(on_release=rename_callback)
+        self.open()
+
+    # pylint: disable=R0801
+    def dismiss_dialog(self, _):
+        """Closes dialog."""
+        self.dismiss()
 
-            new_template = os.path.join(templates_path, f"{title.text}.yaml")
-            new_list = os.path.join(lists_path, title.text)
-            new_archive = os.path.join(archives_path, title.text)
 
-            with open(new_template, "w", encoding="utf-8") as file:
-                yaml.dump(template, file, default_flow_style=False, sort_keys=False)
+class FilterDialog(MDDialog):
+    """New saved filter dialog box."""
 
-            os.remove(old_template)
-            os.rename(old_list, new_list)
-            if os.path.exists(old_archive):
-                os.rename(old_archive, new_archive)
+    def open_filter_dialog(self, save_fn):
+        """Opens the filter dialog. save_fn is called with the filter name
+        and query."""
+
+        def save_callback(_):
+            save_fn(self.ids.filter_name.text.strip(), self.ids.filter_query.text)
             self.dismiss_dialog(_)
 
         self.ids.cancel_btn.bind(on_release=self.dismiss_dialog)
-        self.ids.rename_btn.bind(on_release=rename_callback)
+        self.ids.save_btn.bind(on_release=save_callback)
         self.open()
 
     # pylint: disable=R0801
@@ -0,0 +1,150 @@
+"""Saved item filters of the lists and their dropdown menu."""
+
+from kivymd.uix.menu import MDDropdownMenu
+from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
+
+from components.dialogs import FilterDialog
+from storage.query import Query
+from storage.repository import template_field_types
+from utils import (
+    FILTERS_PATH,
+    error_dialog,
+    get_repository,
+    open_yaml_file,
+    run_io,
+    save_to_yaml,
+)
+
+
+class SavedFilters:
+    """
+    The filters saved for each list, kept in FILTERS_PATH, and the one
+    applied to each list.
+    """
+
+    def __init__(self, on_change):
+        """
+        Parameters:
+        - on_change (fn): Called without arguments once the applied filter
+          of a list changed.
+        """
+        self.on_change = on_change
+        self.saved = None  # list name -> filter name -> query
+        self.applied = {}  # list name -> filter name
+        self.dropdown = None
+
+    def list_filters(self, list_name: str) -> dict:
+        """Returns the saved filter names and queries of a list."""
+        if self.saved is None:
+            try:
+                self.saved = open_yaml_file(FILTERS_PATH) or {}
+            except OSError:
+                self.saved = {}
+        return self.saved.setdefault(list_name, {})
+
+    def is_applied(self, list_name: str) -> bool:
+        """Whether a filter is applied to a list."""
+        return list_name in self.applied
+
+    def query(self, list_name: str):
+        """Returns the applied filter of a list as a Query, or None."""
+        name = self.applied.get(list_name)
+        text = self.list_filters(list_name).get(name)
+        if text is None:
+            return None
+        fields = template_field_types(get_repository().template_path(list_name))
+        try:
+            return Query(text, fields)
+        except ValueError:
+            return None
+
+    def open_menu(self, caller, list_name: str):
+        """Opens the dropdown applying, adding and deleting saved filters."""
+        applied = self.applied.get(list_name)
+        menu_items = [
+            {
+                "text": f"{'* ' if name == applied else ''}{name}",
+                "on_release": lambda x=name: self.apply(list_name, x),
+            }
+            for name in self.list_filters(list_name)
+        ]
+        menu_items.append(
+            {
+                "text": "New Filter",
+                "on_release": lambda _="new": self.new_filter(list_name),
+            }
+        )
+        if applied is not None:
+            menu_items += [
+                {
+                    "text": "Clear Filter",
+                    "on_release": lambda _="clear": self.apply(list_name, None),
+                },
+                {
+                    "text": f"Delete {applied}",
+                    "on_release": lambda x=applied: self.delete(list_name, x),
+                },
+            ]
+        self.dropdown = MDDropdownMenu(
+            caller=caller, items=menu_items, hor_growth="left"
+        )
+        self.dropdown.open()
+
+    def apply(self, list_name: str, name):
+        """Shows only the items matching a saved filter, or all for None."""
+        if self.dropdown is not None:
+            self.dropdown.dismiss()
+        if name is None:
+            self.applied.pop(list_name, None)
+        else:
+            self.applied[list_name] = name
+        self.on_change()
+
+    def new_filter(self, list_name: str):
+        """Opens the dialog saving a new filter of a list."""
+        if self.dropdown is not None:
+            self.dropdown.dismiss()
+        dialog = FilterDialog()
+        dialog.open_filter_dialog(
+            lambda name, text: self.save(list_name, name, text)
+        )
+
+    def save(self, list_name: str, name: str, text: str):
+        """Checks, saves and applies a filter of a list."""
+        fields = template_field_types(get_repository().template_path(list_name))
+        try:
+            Query(text, fields)
+        except ValueError as e:
+            MDDialog(MDDialogSupportingText(text=f"Invalid filter: {e}")).open()
+            return
+        name = name or text
+        self.list_filters(list_name)[name] = text
+        self.write()
+        self.apply(list_name, name)
+
+    def delete(self, list_name: str, name: str):
+        """Deletes a saved filter of a list, clearing it if applied."""
+        self.list_filters(list_name).pop(name, None)
+        self.write()
+        self.apply(list_name, None)
+
+    def rename_list(self, old_name: str, new_name: str):
+        """Moves the saved and applied filters of a renamed list."""
+        if self.list_filters(old_name):
+            self.saved[new_name] = self.saved.pop(old_name)
+            self.write()
+        if old_name in self.applied:
+            self.applied[new_name] = self.applied.pop(old_name)
+
+    def write(self):
+        """Saves the filters of every list in the background."""
+        # Copied, as the dialogs may change them while they are written.
+        filters = {
+            list_name: dict(saved) for list_name, saved in self.saved.items() if saved
+        }
+        run_io(
+            save_to_yaml,
+            FILTERS_PATH,
+            filters,
+            on_error=error_dialog("Filters could not be saved"),
+        )
@@ -1,7 +1,9 @@
 """Custom field view forms."""
 
+from collections import OrderedDict
+
 # pylint: disable=E0611
-from kivy.properties import StringProperty
+from kivy.properties import ListProperty, StringProperty
 
 from kivymd.uix.dialog import (
     MDDialog,
@@ -16,6 +18,8 @@ from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.recycleview import MDRecycleView
 from kivymd.uix.button import MDButton, MDButtonText
 
+from storage import metrics
+
 
 # pylint: disable=too-many-ancestors
 class NewFieldForm(MDList):
@@ -85,6 +89,43 @@ class NewItemForm(MDBoxLayout):
     """New item form."""
 
 
+# Size of a TableCell, see main.kv.
+TABLE_CELL_WIDTH = 400
+TABLE_ROW_HEIGHT = 60
+
+# Number of form layouts a FormPool keeps built.
+MAX_POOLED_FORMS = 8
+
+
+class FormPool:
+    """
+    Built form widgets kept per form layout, so that showing a form again
+    only rebinds values instead of creating widgets and event bindings.
+    """
+
+    def __init__(self, build_fn, size: int = MAX_POOLED_FORMS):
+        """
+        Parameters:
+        - build_fn (fn): Called with a layout key, returns the list of form
+          widgets for it, with their bindings attached.
+        - size (int): The number of layouts to keep.
+        """
+        self.build_fn = build_fn
+        self.size = size
+        self.forms = OrderedDict()
+
+    def get(self, key) -> list:
+        """Returns the form widgets of a layout, building them on first use."""
+        if key in self.forms:
+            self.forms.move_to_end(key)
+        else:
+            self.forms[key] = self.build_fn(key)
+            metrics.count("widgets_created", len(self.forms[key]))
+            while len(self.forms) > self.size:
+                self.forms.popitem(last=False)
+        return self.forms[key]
+
+
 # pylint: disable=too-many-ancestors
 class TableView(MDRecycleView):
     """Table view."""
@@ -95,3 +136,20 @@ class TableCell(MDBoxLayout):
     """Table cell class for use in TableView"""
 
     text = StringProperty(None)
+
+
+# pylint: disable=too-many-ancestors
+class TableRow(MDBoxLayout):
+    """Table row for use in TableView, showing one TableCell per column."""
+
+    cells = ListProperty()
+
+    def on_cells(self, _instance, cells):
+        """Fills the cells of the row the view is bound to."""
+        while len(self.children) < len(cells):
+            self.add_widget(TableCell())
+            metrics.count("widgets_created")
+        while len(self.children) > len(cells):
+            self.remove_widget(self.children[0])
+        for cell, text in zip(reversed(self.children), cells):
+            cell.text = text
@@ -0,0 +1,123 @@
+"""Table view state of the items screen."""
+
+import os
+
+from kivymd.uix.menu import MDDropdownMenu
+from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
+
+from components.forms import TABLE_CELL_WIDTH, TABLE_ROW_HEIGHT, TableView
+from storage import metrics
+from storage.repository import template_field_types
+from storage.table import TableModel
+from utils import LIST_PATH, get_repository
+
+
+class ItemsTable:
+    """
+    The loaded table of the list shown, with the columns hidden in each
+    list and the sort order.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.model = None
+        self.hidden_columns = {}  # list name -> columns not loaded
+        self.sort_by = None
+        self.reverse = False
+        self.dropdown = None
+
+    @property
+    def columns(self) -> list:
+        """The shown columns of the loaded table."""
+        return [] if self.model is None else self.model.columns
+
+    def load(self, list_name: str, query=None):
+        """Loads the table rows, parsing only items changed since last load."""
+        directory_path = os.path.join(LIST_PATH, list_name)
+        fields = template_field_types(get_repository().template_path(list_name))
+        hidden = frozenset(self.hidden_columns.get(list_name, ()))
+        if query is not None:
+            # The filter runs on the loaded columns.
+            hidden -= query.fields
+        model = self.model
+        if (
+            directory_path != self.directory
+            or model is None
+            or fields != model.fields
+            or hidden != model.hidden
+        ):
+            self.directory = directory_path
+            self.model = TableModel(fields, hidden)
+        self.model.load(directory_path, get_repository().entries(list_name))
+
+    def show(self, scroll_area, query=None):
+        """Shows the loaded table rows in the current sort order."""
+        try:
+            table_view = TableView()
+            metrics.count("widgets_created")
+            # Rows format their cells only once they scroll into view.
+            table_view.data = self.model.view_data(self.sort_by, self.reverse, query)
+            table_view.ids.recycle_box.default_size = (
+                len(self.columns) * TABLE_CELL_WIDTH,
+                TABLE_ROW_HEIGHT,
+            )
+            scroll_area.clear_widgets()
+            scroll_area.add_widget(table_view)
+
+        except IndexError as e:
+            MDDialog(
+                MDDialogSupportingText(text=f"Table could not be generated: {e}")
+            ).open()
+
+    def sort_menu(self, caller, on_sort):
+        """Opens the dropdown picking the sort column. on_sort is called after."""
+
+        def sort(column):
+            self.dropdown.dismiss()
+            # Picking the same column again toggles the order.
+            self.reverse = column == self.sort_by and not self.reverse
+            self.sort_by = column
+            on_sort()
+
+        menu_items = [
+            {"text": f"{column}", "on_release": lambda x=column: sort(x)}
+            for column in self.columns
+        ]
+        self.dropdown = MDDropdownMenu(
+            caller=caller,
+            items=menu_items,
+            hor_growth="right",
+            position="bottom",
+            width_mult=2,
+        )
+        self.dropdown.open()
+
+    def columns_menu(self, caller, list_name: str, on_change):
+        """Opens the dropdown showing or hiding table columns of a list."""
+        hidden = self.hidden_columns.setdefault(list_name, set())
+        known = list(self.columns) + [
+            column for column in sorted(hidden) if column not in self.columns
+        ]
+        menu_items = [
+            {
+                "text": f"{'Show' if column in hidden else 'Hide'} {column}",
+                "on_release": lambda x=column: self.toggle_column(
+                    list_name, x, on_change
+                ),
+            }
+            for column in known
+        ]
+        self.dropdown = MDDropdownMenu(
+            caller=caller, items=menu_items, hor_growth="left"
+        )
+        self.dropdown.open()
+
+    def toggle_column(self, list_name: str, column: str, on_change):
+        """Hides a shown table column, or shows a hidden one."""
+        self.dropdown.dismiss()
+        hidden = self.hidden_columns.setdefault(list_name, set())
+        if column in hidden:
+            hidden.discard(column)
+        elif len(self.columns) > 1:
+            hidden.add(column)
+        on_change()
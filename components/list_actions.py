@@ -0,0 +1,158 @@
+"""List actions of the items screen menu: exports and the storage layout."""
+
+import os
+import threading
+
+from kivy.clock import Clock
+
+from kivymd.uix.menu import MDDropdownMenu
+from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
+
+from storage import metrics
+from storage.export import (
+    export_csv,
+    export_records,
+    scan_fields,
+    template_fields,
+)
+from storage.log_store import export_yaml, get_store, pack_directory, unpack_directory
+from utils import (
+    ARCHIVES_PATH,
+    EXPORTS_PATH,
+    LIST_PATH,
+    error_dialog,
+    get_repository,
+    run_io,
+)
+
+EXPORT_FORMATS = {
+    "CSV": "csv",
+    "JSON Lines": "jsonl",
+    "Columnar": "columnar",
+    "YAML Files": "yaml",
+}
+
+
+def export_menu(caller, list_name: str) -> None:
+    """Opens the export format dropdown menu of a list."""
+    menu_items = [
+        {
+            "text": text,
+            "on_release": lambda x=export_format: export_list(
+                list_name, export_format=x
+            ),
+        }
+        for text, export_format in EXPORT_FORMATS.items()
+    ]
+    menu = MDDropdownMenu(caller=caller, items=menu_items, hor_growth="left")
+    menu.open()
+
+
+def export_list(list_name: str, source=LIST_PATH, export_format="csv") -> None:
+    """
+    Summary:
+    Exports list (or archive) data in a background thread, streaming csv
+    row by row and showing the progress in a dialog.
+
+    Parameters:
+    - list_name (str): The list name.
+    - source (str): LIST_PATH, or ARCHIVES_PATH to export the archive.
+    - export_format (str): One of the EXPORT_FORMATS values.
+
+    Returns:
+    None
+    """
+    repository = get_repository()
+    archived = source == ARCHIVES_PATH
+    directory_path = repository.list_dir(list_name, archived)
+    output_name = f"{list_name}_archive" if archived else list_name
+    progress_text = MDDialogSupportingText(text="Exporting...")
+    MDDialog(progress_text).open()
+
+    def show_progress(done, total):
+        Clock.schedule_once(
+            lambda _: setattr(progress_text, "text", f"Exporting {done}/{total}")
+        )
+
+    @metrics.timed("export")
+    def export():
+        template_path = repository.template_path(list_name)
+        try:
+            if export_format == "csv":
+                files = repository.item_names(list_name, archived)
+                fieldnames = scan_fields(
+                    directory_path, files, template_fields(template_path)
+                )
+                export_csv(
+                    directory_path,
+                    files,
+                    os.path.join(EXPORTS_PATH, f"{output_name}.csv"),
+                    fieldnames,
+                    show_progress,
+                )
+            elif export_format == "yaml":
+                export_yaml(
+                    directory_path,
+                    repository.item_names(list_name, archived),
+                    # A folder of files, named apart from the csv export.
+                    os.path.join(EXPORTS_PATH, f"{output_name}_yaml"),
+                )
+            else:
+                export_records(
+                    directory_path,
+                    template_path,
+                    EXPORTS_PATH,
+                    output_name,
+                    export_format,
+                )
+            text = "Data has been saved in the exports folder."
+        except OSError as e:
+            text = f"Export failed: {e}"
+        Clock.schedule_once(lambda _: setattr(progress_text, "text", text))
+
+    threading.Thread(target=export, daemon=True).start()
+
+
+def toggle_storage(list_name: str, on_done) -> None:
+    """
+    Summary:
+    Switches a list and its archive between a log and yaml files, in the
+    background. The I/O worker runs the writes still waiting to be
+    coalesced first, so none of them lands in the old layout.
+
+    Parameters:
+    - list_name (str): The list name.
+    - on_done (fn): Called without arguments once the switch finished or
+      failed, on the UI thread.
+
+    Returns:
+    None
+    """
+    repository = get_repository()
+    packed = get_store(repository.list_dir(list_name)) is not None
+    if packed:
+        text = "List items are now kept as yaml files."
+    else:
+        text = "List items are now kept in a single file."
+    show_error = error_dialog("Storage could not be changed")
+
+    def switch():
+        for archived in (False, True):
+            directory = repository.list_dir(list_name, archived)
+            if not os.path.isdir(directory):
+                continue
+            if packed:
+                unpack_directory(directory)
+            else:
+                names = repository.item_names(list_name, archived)
+                pack_directory(directory, names)
+
+    def switched(_result):
+        MDDialog(MDDialogSupportingText(text=text)).open()
+        on_done()
+
+    def failed(e):
+        show_error(e)
+        on_done()
+
+    run_io(switch, on_done=switched, on_error=failed)
@@ -1,8 +1,8 @@
 """Custom Lists for Lists and Items"""
 
-import os
-import shutil
-
+# pylint: disable=E0611
+from kivy.properties import BooleanProperty, StringProperty
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 
 from kivymd.uix.dialog import (
     MDDialog,
@@ -11,16 +11,16 @@ from kivymd.uix.dialog import (
 )
 from kivymd.uix.card import MDCard
 from kivymd.uix.list import MDList
+from kivymd.uix.recycleview import MDRecycleView
 from kivymd.uix.button import MDButton, MDButtonText
 
+from storage import metrics
 from utils import (
-    ARCHIVES_PATH,
-    LIST_PATH,
-    TEMPLATE_PATH,
     change_screen,
+    error_dialog,
+    get_repository,
     get_screen_element,
-    open_yaml_file,
-    save_to_yaml,
+    run_io,
 )
 
 
@@ -31,6 +31,7 @@ class ListOfLists(MDList):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.dialog = MDDialog()
+        metrics.count("widgets_created")
 
     def on_release(self):
         """Sets the screen title to the item title."""
@@ -67,18 +68,17 @@ class ListOfLists(MDList):
         """Deletes the list folder and all files."""
         list_name = get_screen_element("items_screen", "topbar")
         list_name.text = self.ids.headline.text
-        template_file = os.path.join(TEMPLATE_PATH, f"{self.ids.headline.text}.yaml")
-        list_dir = os.path.join(LIST_PATH, f"{self.ids.headline.text}/")
-        archive_dir = os.path.join(ARCHIVES_PATH, f"{self.ids.headline.text}/")
-        try:
-            if os.path.exists(archive_dir):
-                shutil.rmtree(archive_dir)
-            shutil.rmtree(list_dir)
-            os.remove(template_file)
-            self.parent.remove_widget(self)
-            self.dialog.dismiss()
-        except OSError as e:
-            MDDialog(MDDialogSupportingText(text=f"Deletion failed: {e}")).open()
+        container = self.parent
+        show_error = error_dialog("Deletion failed")
+
+        def on_error(e):
+            container.add_widget(self)
+            show_error(e)
+
+        # The list disappears right away and comes back if deleting fails.
+        container.remove_widget(self)
+        self.dialog.dismiss()
+        run_io(get_repository().delete_list, self.ids.headline.text, on_error=on_error)
 
     def close_dialog(self, _):
         """Closes the delete list confirmation dialog."""
@@ -86,30 +86,64 @@ class ListOfLists(MDList):
 
 
 # pylint: disable=R0901
-class ListOfItems(MDCard):
+class ListOfItems(RecycleDataViewBehavior, MDCard):
     """List of user created items."""
 
+    text = StringProperty("")
+    yaml_path = StringProperty("")
+    checked = BooleanProperty(False)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.yaml_path = ""
-        self.checked = False
+        self.index = None
+        self.recycle_view = None
+        metrics.count("widgets_created")
+
+    def refresh_view_attrs(self, rv, index, data):
+        """Keeps track of the data row this view is bound to."""
+        self.index = index
+        self.recycle_view = rv
+        return super().refresh_view_attrs(rv, index, data)
+
+    def update_data(self, **values):
+        """Writes changed values back to the bound data row."""
+        self.recycle_view.data[self.index].update(values)
+        self.recycle_view.refresh_from_data()
+
+    def remove_data(self):
+        """Removes the bound data row from the view and returns a restore fn."""
+        recycle_view = self.recycle_view
+        index = self.index
+        row = recycle_view.data.pop(index)
 
-    def mark(self, check):
+        def restore():
+            recycle_view.data.insert(min(index, len(recycle_view.data)), row)
+
+        return restore
+
+    def mark(self):
         """Check/Uncheck item"""
-        item = open_yaml_file(self.yaml_path)
-        try:
-            if item["checked"]:
-                item["checked"] = False
-                check.icon = "checkbox-blank-outline"
-                self.ids.headline.text = self.ids.headline.text.replace("[s]", "")
-            elif not item["checked"]:
-                item["checked"] = True
-                check.icon = "checkbox-marked-outline"
-                self.ids.headline.text = f"[s]{self.ids.headline.text}[/s]"
-        except KeyError:
-            item["checked"] = False
-
-        save_to_yaml(self.yaml_path, item)
+        checked = not self.checked
+        path = self.yaml_path
+        recycle_view = self.recycle_view
+        show_error = error_dialog("Item could not be saved")
+
+        def on_error(e):
+            for row in recycle_view.data:
+                if row["yaml_path"] == path:
+                    row["checked"] = not checked
+            recycle_view.refresh_from_data()
+            show_error(e)
+
+        # Shown right away. Quick toggles of the same item end in one write.
+        self.update_data(checked=checked)
+        run_io(
+            get_repository().set_checked,
+            path,
+            checked,
+            on_error=on_error,
+            coalesce_key=path,
+        )
 
     def on_press(self, *args):
         """Update screen title."""
@@ -117,31 +151,18 @@ class ListOfItems(MDCard):
         title_element.text = self.yaml_path.replace(".yaml", "")
         change_screen("view_item_screen")
 
-    def delete_item(self, list_of_items):
+    def delete_item(self):
         """Deletes the item yaml file."""
-        os.remove(f"{self.yaml_path}")
-        self.parent.remove_widget(list_of_items)
-
-    def archive_item(self):
-        """Moves item to archives."""
-
-        list_name = get_screen_element("items_screen", "list_title").text
-        source_file = os.path.join(self.yaml_path)
-        destination_path = ""
-
-        file = os.path.basename(source_file)
-        if os.path.exists(os.path.join(ARCHIVES_PATH, list_name, file)):
-            destination_path = os.path.join(LIST_PATH, list_name)
-        elif os.path.exists(os.path.join(LIST_PATH, list_name, file)):
-            destination_path = os.path.join(ARCHIVES_PATH, list_name)
-
-        if not os.path.exists(destination_path):
-            os.makedirs(destination_path)
-
-        try:
-            shutil.move(source_file, destination_path)
-            self.parent.remove_widget(self)
-        except OSError as e:
-            MDDialog(
-                MDDialogSupportingText(text=f"File could not be moved: {e}")
-            ).open()
+        restore = self.remove_data()
+        show_error = error_dialog("Item could not be deleted")
+
+        def on_error(e):
+            restore()
+            show_error(e)
+
+        run_io(get_repository().delete_item, self.yaml_path, on_error=on_error)
+
+
+# pylint: disable=too-many-ancestors
+class ItemsView(MDRecycleView):
+    """Virtualized list of items."""
@@ -1,22 +1,25 @@
 """Main App Build"""
 
+import time
+
+START_TIME = time.perf_counter()
+
+# pylint: disable=C0413
 import os
 import logging
 
 
 from kivymd.app import MDApp
 
+from kivy.clock import Clock
 from kivy.utils import platform
-from kivy.uix.screenmanager import ScreenManager
-
-from components.lists import ListOfLists
 
-from screens.main_screen import MainScreen
-from screens.items_screen import ItemsScreen
-from screens.new_item_screen import NewItemScreen
-from screens.view_item_screen import ViewItemScreen
-from screens.edit_template_screen import EditTemplateScreen
-from screens.template_create_screen import TemplateCreateScreen
+from screens.screen_manager import SCREENS, LazyScreenManager
+from storage import metrics
+from storage.atomic import set_fsync_policy
+from storage.executor import IOExecutor
+from storage.repository import open_repository
+from storage.watcher import Watcher, apply_events
 from utils import (
     DOCUMENTS_PATH,
     EXPORTS_PATH,
@@ -24,11 +27,13 @@ from utils import (
     TEMPLATE_PATH,
     ASSETS_PATH,
     ARCHIVES_PATH,
-    get_folder_list,
     open_yaml_file,
 )
 
 CONFIG = open_yaml_file(os.path.join(ASSETS_PATH, "config.yaml"))
+IMPORT_TIME = time.perf_counter()
+# Set LISTER_EAGER_SCREENS=1 to build every screen at startup, for comparison.
+EAGER_SCREENS = os.environ.get("LISTER_EAGER_SCREENS") == "1"
 logger = logging.getLogger(__name__)
 
 
@@ -37,10 +42,35 @@ class MainApp(MDApp):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.folder_list = []
-
-    # def on_start(self):
-    #    """Populate the List of Lists."""
+        # Opened in build, once the app is configured.
+        self.repository = None
+        self.io_executor = None
+        self.watcher = None
+        self.page_size = int(CONFIG.get("page_size", 50))
+
+    def on_start(self):
+        """Populate the List of Lists and log the startup time."""
+        self.request_android_permissions()
+        Clock.schedule_once(self.log_startup_time)
+
+    def on_stop(self):
+        """Finishes the queued file operations before exiting."""
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.io_executor.shutdown()
+        if metrics.is_enabled():
+            metrics.dump(os.path.join(DOCUMENTS_PATH, "metrics.json"))
+
+    def log_startup_time(self, _dt):
+        """Logs the time from interpreter start of main.py to the first frame."""
+        now = time.perf_counter()
+        metrics.record("startup", int((now - START_TIME) * 1e9))
+        logger.info(
+            "Startup (%s screens): imports %.1f ms, first frame %.1f ms",
+            "eager" if EAGER_SCREENS else "lazy",
+            (IMPORT_TIME - START_TIME) * 1000,
+            (now - START_TIME) * 1000,
+        )
 
     def request_android_permissions(self):
         """Request necessary permissions on Android."""
@@ -81,20 +111,7 @@ class MainApp(MDApp):
 
     def refresh_folder_view(self):
         """Updates the display to show the current list of folders."""
-
-        screen = self.root.get_screen("main_screen")
-        new_folder_list = get_folder_list(LIST_PATH)
-
-        # Add widgets for each folder
-        for list_item in new_folder_list:
-            if list_item not in self.folder_list:
-                add_list = ListOfLists()
-                add_list.ids.headline.text = list_item
-                screen.ids.list_container.add_widget(add_list)
-                self.folder_list.append(list_item)
-            else:
-                print(f"Item: {list_item} is already on self.folder_list")
-        self.folder_list = new_folder_list
+        self.root.get_screen("main_screen").reset_list()
 
     def create_dirs(self):
         """Creates the initial lists and templates folders."""
@@ -123,20 +140,64 @@ class MainApp(MDApp):
             os.makedirs(TEMPLATE_PATH, exist_ok=True)
             os.makedirs(EXPORTS_PATH, exist_ok=True)
             os.makedirs(ARCHIVES_PATH, exist_ok=True)
+        self.start_watcher()
+
+    def start_watcher(self):
+        """Watches the Lister folders for changes made outside the app."""
+        mode = CONFIG.get("watch_files", "auto")
+        if mode == "off" or self.watcher is not None:
+            return
+        self.watcher = Watcher(
+            [LIST_PATH, ARCHIVES_PATH, TEMPLATE_PATH],
+            self.on_file_changes,
+            polling=mode == "polling",
+        )
+        self.watcher.start()
+
+    def on_file_changes(self, events):
+        """Updates the indexes for watcher events, on the I/O worker."""
+        self.io_executor.submit(
+            apply_events,
+            events,
+            [LIST_PATH, ARCHIVES_PATH],
+            on_done=self.dispatch_file_changes,
+        )
+
+    def dispatch_file_changes(self, events):
+        """Lets the open screens patch the rows of the changed files."""
+        if not events:
+            return
+        for name in ("main_screen", "items_screen"):
+            screen = self.root.built_screen(name)
+            if screen is not None:
+                screen.on_file_changes(events)
 
     def build(self):
         """Build app theme and screens"""
-        logger.debug("Requesting permissions")
-        self.request_android_permissions()
         self.theme_cls.theme_style = "Dark"
 
-        sm = ScreenManager()
-        sm.add_widget(MainScreen(name="main_screen"))
-        sm.add_widget(TemplateCreateScreen(name="template_create_screen"))
-        sm.add_widget(ItemsScreen(name="items_screen"))
-        sm.add_widget(NewItemScreen(name="new_item_screen"))
-        sm.add_widget(ViewItemScreen(name="view_item_screen"))
-        sm.add_widget(EditTemplateScreen(name="edit_template_screen"))
+        self.repository = open_repository(
+            CONFIG.get("storage_backend", "files"),
+            LIST_PATH,
+            ARCHIVES_PATH,
+            TEMPLATE_PATH,
+            os.path.join(DOCUMENTS_PATH, ".lister.db"),
+        )
+        set_fsync_policy(CONFIG.get("fsync", "file"))
+        if CONFIG.get("metrics"):
+            metrics.enable()
+        self.io_executor = IOExecutor(
+            lambda fn: Clock.schedule_once(lambda _dt: fn())
+        )
+
+        # Screens are registered as factories and built on first navigation.
+        sm = LazyScreenManager()
+        for name, (module, class_name) in SCREENS.items():
+            sm.register(name, module, class_name)
+        sm.build_screen("main_screen")
+        if EAGER_SCREENS:
+            sm.build_all()
+        return sm
 
 
 if __name__ == "__main__":
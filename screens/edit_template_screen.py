@@ -1,12 +1,11 @@
 """Edit Template Screen"""
 
-import os
-import yaml
 from yaml.scanner import ScannerError
 
 from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
 from kivy.uix.screenmanager import Screen
-from utils import TEMPLATE_PATH, open_yaml_file, save_to_yaml
+from storage.codec import load_yaml
+from utils import error_dialog, get_repository, run_io
 
 
 class EditTemplateScreen(Screen):
@@ -14,23 +13,28 @@ class EditTemplateScreen(Screen):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.template_path = ""
+        self.list_name = ""
 
     def on_enter(self, *args):
         """Populates the yaml template data."""
 
-        self.template_path = os.path.join(
-            TEMPLATE_PATH, f"{self.ids.list_title.text}.yaml"
-        )
-        template = open_yaml_file(self.template_path)
-        self.ids.template_text.text = yaml.dump(template)
+        self.list_name = self.ids.list_title.text
+        template = get_repository().read_template(self.list_name)
+        self.ids.template_text.text = template.text
 
     def on_save(self):
         """Saves the data to the yaml template."""
         new_template = self.ids.template_text.text
         try:
-            new_yaml = yaml.safe_load(new_template)
-            save_to_yaml(self.template_path, new_yaml)
-            MDDialog(MDDialogSupportingText(text="Template saved.")).open()
+            new_yaml = load_yaml(new_template)
+            run_io(
+                get_repository().write_template,
+                self.list_name,
+                new_yaml,
+                on_done=lambda _: MDDialog(
+                    MDDialogSupportingText(text="Template saved.")
+                ).open(),
+                on_error=error_dialog("Template could not be saved"),
+            )
         except ScannerError as e:
             MDDialog(MDDialogSupportingText(text=f"Invalid yaml format:{e}")).open()
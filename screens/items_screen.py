@@ -1,34 +1,37 @@
 """Item List View Screen"""
 
-from concurrent.futures import ThreadPoolExecutor
 import os
-import csv
-import logging
 
 from kivy.clock import Clock
 from kivy.uix.screenmanager import Screen
 
-from kivymd.uix.list import MDList
+from kivymd.app import MDApp
 from kivymd.uix.menu import MDDropdownMenu
 from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
 
-from components.forms import TableView
-from components.lists import ListOfItems
 from components.dialogs import SearchDialog, RenameDialog
+from components.filters import SavedFilters
+from components.items_table import ItemsTable
+from components.list_actions import export_list, export_menu, toggle_storage
+from components.lists import ItemsView
+from storage.index import get_index
+from storage import metrics
+from storage.records import ItemRow
+from storage.search import get_search_index
 from utils import (
-    EXPORTS_PATH,
+    DOCUMENTS_PATH,
     LIST_PATH,
     ARCHIVES_PATH,
-    TEMPLATE_PATH,
     change_screen,
+    error_dialog,
+    get_repository,
     get_screen_element,
-    open_yaml_file,
-    sort_files_by_datetime,
+    run_io,
 )
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Above this many changed rows, outside changes reload the view instead.
+MAX_PATCHED_ROWS = 50
 
 
 class ItemsScreen(Screen):
@@ -38,10 +41,10 @@ class ItemsScreen(Screen):
         super().__init__(**kwargs)
         self.title = None
         self.view = "list"
-        self.sort_by = None
-        self.columns = []
-        self.md_list = MDList(spacing="12dp")
-        self.reverse = False
+        self.items_view = ItemsView()
+        self.table = ItemsTable()
+        self.filters = SavedFilters(self._filter_changed)
+        self.page_loader = None
 
     def on_enter(self, *args):
         """Populates the list Items."""
@@ -60,140 +63,161 @@ class ItemsScreen(Screen):
 
     def sort_dropdown(self, instance):
         """Creates the sort button dropdown values."""
-        menu_items = [
-            {
-                "text": f"{col}",
-                "on_release": lambda x=index, y=f"{col}": self.update_sort_btn_text(
-                    instance, x, y
-                ),
-            }
-            for index, col in enumerate(self.columns)
-        ]
-        menu = MDDropdownMenu(
-            caller=instance,
-            items=menu_items,
-            hor_growth="right",
-            position="bottom",
-            width_mult=2,
-        )
-        menu.open()
+        self.table.sort_menu(instance, self._show_sorted)
 
-    def update_sort_btn_text(self, _caller_btn, _index, col):
-        """Updates the sort button dropdown value."""
-        self.sort_by = col
-        self.refresh_view()
+    def _show_sorted(self):
+        if self.view == "table" and self.table.model is not None:
+            self.table.show(
+                self.ids.scroll_area, self.filters.query(self.ids.list_title.text)
+            )
+        else:
+            self.refresh_view()
 
     def populate_list_view(self, source: str):
-        """Populates the list view."""
+        """Populates the list view, newest items first, a page at a time."""
+        self.cancel_loading()
+        with metrics.span("list_open"):
+            self.open_list(source)
 
+    def open_list(self, source: str):
+        """Shows the first page of a list and starts streaming the rest."""
         try:
-            # Get the directory path and list all files
-            directory_path = os.path.join(source, self.ids.list_title.text)
-            with os.scandir(directory_path) as entries:
-                files = [entry.name for entry in entries if entry.is_file()]
-            sorted_files = sort_files_by_datetime(files)
-
-            def process_file(file_path):
-                try:
-                    yaml_file_path = os.path.join(directory_path, file_path)
-                    fl = open_yaml_file(yaml_file_path)
-                    first_field = next(iter(fl))
-
-                    item_data = {
-                        "text": fl[first_field],
-                        "secondary_text": yaml_file_path,
-                        "checked": fl.get("checked", False),
-                        "source": source,
-                    }
-
-                    return item_data
-                except IOError as e:
-                    logging.error("Error processing file %e", e)
-                    return None
-
-            cond_1 = len(self.md_list.children) != len(sorted_files)
-            cond_2 = self.ids.list_title.text != self.title
-            cond_3 = self.view == "archive" and source != ARCHIVES_PATH
-            cond_4 = self.view == "list" and source != LIST_PATH
-
-            # Use ThreadPoolExecutor to process files in parallel
-            if (cond_1) or (cond_2) or (cond_3) or (cond_4):
-                self.md_list.clear_widgets()
-                with ThreadPoolExecutor() as executor:
-                    items_data = sorted(
-                        list(executor.map(process_file, sorted_files)),
-                        key=lambda x: x["checked"],
-                    )
-
-                # Schedule the update of UI elements on the main thread
-                Clock.schedule_once(lambda _: self.update_ui(items_data))
-                self.title = self.ids.list_title.text
+            # The list index only re-parses files changed since the last open,
+            # and only one page of them per frame. Filters stop reading once
+            # a page of matches is full.
+            list_name = self.ids.list_title.text
+            query = self.filters.query(list_name)
+            if query is None:
+                pages = get_repository().entry_pages(
+                    list_name,
+                    MDApp.get_running_app().page_size,
+                    archived=source == ARCHIVES_PATH,
+                )
             else:
-                self.ids.scroll_area.add_widget(self.md_list)
-
+                pages = get_repository().filter_pages(
+                    list_name,
+                    query,
+                    MDApp.get_running_app().page_size,
+                    archived=source == ARCHIVES_PATH,
+                )
+            first_page = next(pages, {})
         except OSError:
             MDDialog(MDDialogSupportingText(text="No items to show.")).open()
+            return
 
-    def update_ui(self, items_data):
-        """Updates the UI with processed items data."""
+        cond_1 = len(self.items_view.data) != len(first_page)
+        cond_2 = self.ids.list_title.text != self.title
+        cond_3 = self.view == "archive" and source != ARCHIVES_PATH
+        cond_4 = self.view == "list" and source != LIST_PATH
 
         self.ids.scroll_area.clear_widgets()
-        for item_data in items_data:
-            item_row = ListOfItems()
-            item_row.ids.headline.text = item_data["text"][:40]
-            item_row.yaml_path = item_data["secondary_text"]
-
-            if item_data["checked"]:
-                item_row.ids.check.icon = "checkbox-marked-outline"
-                item_row.ids.headline.text = f"[s]{item_row.ids.headline.text}[/s]"
-            else:
-                item_row.ids.check.icon = "checkbox-blank-outline"
+        self.ids.scroll_area.add_widget(self.items_view)
+        if not (cond_1 or cond_2 or cond_3 or cond_4):
+            return
+        directory_path = os.path.join(source, self.ids.list_title.text)
+        self.items_view.data = []
+        self.add_page(directory_path, first_page)
+        self.title = self.ids.list_title.text
+
+        def load_next_page(_dt):
+            try:
+                page = next(pages, None)
+            except OSError:
+                page = None
+            if page is None:
+                self.page_loader = None
+                return False
+            self.add_page(directory_path, page)
+            return True
+
+        self.page_loader = Clock.schedule_interval(load_next_page, 0)
+
+    def add_page(self, directory_path: str, page: dict):
+        """Appends a page of index entries to the list view rows."""
+        rows = self.items_view.data + [
+            ItemRow(directory_path, file_name, entry.headline, entry.checked)
+            for file_name, entry in page.items()
+        ]
+        self.items_view.data = sorted(rows, key=lambda x: x["checked"])
+
+    def cancel_loading(self):
+        """Stops streaming in further pages of the list view."""
+        if self.page_loader is not None:
+            self.page_loader.cancel()
+            self.page_loader = None
+
+    def on_leave(self, *args):
+        """Stops loading items of a list that is no longer shown."""
+        self.cancel_loading()
+
+    def on_file_changes(self, events):
+        """
+        Summary:
+        Patches the rows of items changed outside the app, keeping the rest
+        of the view as is.
+
+        Parameters:
+        - events (list): The (kind, path) changes applied to the indexes.
+
+        Returns:
+        None
+        """
+        if self.manager.current != "items_screen" or self.title is None:
+            return
+        archived = self.view == "archive"
+        directory = os.path.normpath(
+            os.path.join(ARCHIVES_PATH if archived else LIST_PATH, self.title)
+        )
+        changed = [
+            (kind, path)
+            for kind, path in events
+            if kind == "rescan" or os.path.normpath(os.path.dirname(path)) == directory
+        ]
+        if not changed:
+            return
+        if (
+            self.view == "table"
+            or self.filters.is_applied(self.title)
+            or len(changed) > MAX_PATCHED_ROWS
+            or any(kind == "rescan" for kind, _ in changed)
+        ):
+            self.refresh_view()
+            return
 
-            self.md_list.add_widget(item_row)
-        self.ids.scroll_area.add_widget(self.md_list)
+        entries = get_repository().entries(self.title, archived=archived)
+        rows = {os.path.normpath(row["yaml_path"]): row for row in self.items_view.data}
+        added = []
+        for _kind, path in changed:
+            key = os.path.normpath(path)
+            entry = entries.get(os.path.basename(path))
+            if entry is None:
+                rows.pop(key, None)
+                continue
+            row = ItemRow(*os.path.split(path), entry.headline, entry.checked)
+            if key in rows:
+                rows[key] = row
+            else:
+                added.append(row)
+        # New items are the newest, so they go first within their group.
+        self.items_view.data = sorted(
+            added[::-1] + list(rows.values()), key=lambda x: x["checked"]
+        )
 
     def populate_table_view(self):
         """Populates the table view."""
-        all_dicts = []
-        fl = {}
-
-        for file_path in os.listdir(os.path.join(LIST_PATH, self.ids.list_title.text)):
-            yaml_file_path = os.path.join(
-                LIST_PATH, self.ids.list_title.text, file_path
-            )
-            fl = open_yaml_file(yaml_file_path)
-            all_dicts.append(fl)
-
-        sort_cols = fl.copy()
-        self.columns = sort_cols.keys()  # collect column names for dropdown
-
-        if not self.reverse:
-            self.reverse = True
-        else:
-            self.reverse = False
-
-        if self.sort_by:
-            all_dicts = sorted(
-                all_dicts, key=lambda x: x[self.sort_by], reverse=self.reverse
-            )
-
-        table_header = [{"text": str(field)} for field in fl.keys()]
-        table_rows = [
-            {"text": str(item[field])} for item in all_dicts for field in item.keys()
-        ]
-        table_data = table_header + table_rows
-
-        try:
-            table_view = TableView()
-            table_view.data = table_data
-            table_view.ids.recycle_grid.cols = len(self.columns)
-            self.ids.scroll_area.clear_widgets()
-            self.ids.scroll_area.add_widget(table_view)
+        list_name = self.ids.list_title.text
+        query = self.filters.query(list_name)
+        with metrics.span("table_build"):
+            self.table.load(list_name, query)
+            self.table.show(self.ids.scroll_area, query)
+
+    def _filter_changed(self):
+        self.title = None  # the rows shown no longer match
+        self.refresh_view()
 
-        except IndexError as e:
-            MDDialog(
-                MDDialogSupportingText(text=f"Table could not be generated: {e}")
-            ).open()
+    def _columns_changed(self):
+        if self.view == "table":
+            self.populate_table_view()
 
     def menu_open(self, topbar):
         """Opens the field category dropdown menu."""
@@ -210,14 +234,38 @@ class ItemsScreen(Screen):
                 "text": "View Archive",
                 "on_release": lambda x="archive": self.update_view(topbar, x),
             },
+            {
+                "text": "Filters",
+                "on_release": lambda _="filters": self.filters.open_menu(
+                    topbar, self.ids.list_title.text
+                ),
+            },
+            {
+                "text": "Choose Table Columns",
+                "on_release": lambda _="columns": self.table.columns_menu(
+                    topbar, self.ids.list_title.text, self._columns_changed
+                ),
+            },
             {
                 "text": "Move to Archive/Inbox",
                 "on_release": lambda x="archive": self.move_to_archive(),
             },
             {
                 "text": "Export Data",
-                "on_release": lambda _="export": self.export_data(
-                    self.ids.list_title.text
+                "on_release": lambda _="export": export_menu(
+                    topbar, self.ids.list_title.text
+                ),
+            },
+            {
+                "text": "Export Archive",
+                "on_release": lambda _="export": export_list(
+                    self.ids.list_title.text, ARCHIVES_PATH
+                ),
+            },
+            {
+                "text": "Toggle Single-File Storage",
+                "on_release": lambda _="storage": toggle_storage(
+                    self.ids.list_title.text, self.refresh_view
                 ),
             },
             {
@@ -241,37 +289,6 @@ class ItemsScreen(Screen):
         self.view = text
         self.refresh_view()
 
-    def export_data(self, list_name):
-        """Exports list data to csv."""
-        data = []
-        for file_path in os.listdir(os.path.join(LIST_PATH, self.ids.list_title.text)):
-            yaml_file_path = os.path.join(
-                LIST_PATH, self.ids.list_title.text, file_path
-            )
-            fl = open_yaml_file(yaml_file_path)
-            fl["File"] = yaml_file_path
-            data.append(fl)
-
-        # find the dict item with most amount of fields.
-        # this is in case the users manually adds a new field to the template.
-        dict_most_keys = max(data, key=len)
-        fieldnames = dict_most_keys.keys()
-
-        try:
-            with open(
-                os.path.join(EXPORTS_PATH, list_name), "w", newline="", encoding="utf-8"
-            ) as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(data)
-            MDDialog(
-                MDDialogSupportingText(
-                    text="Data has been saved in the exports folder."
-                )
-            ).open()
-        except OSError as e:
-            MDDialog(MDDialogSupportingText(text=f"Export failed: {e}")).open()
-
     def new_item(self, item):
         """Moves to the New Template screen"""
         get_screen_element("new_item_screen", "added_items").clear_widgets()
@@ -279,14 +296,50 @@ class ItemsScreen(Screen):
         change_screen("new_item_screen")
 
     def search(self):
-        """Opens the search dialog."""
+        """Opens the search dialog, searching all fields of all lists."""
         dialog = SearchDialog()
-        dialog.open_search_dialog(self.md_list)
+        dialog.open_search_dialog(self.items_view, self.search_items)
+
+    def search_items(self, query: str, show_results):
+        """
+        Summary:
+        Searches the items of every list and archive in the background. The
+        first search syncs the index, later ones only look it up.
+
+        Parameters:
+        - query (str): The search text.
+        - show_results (fn): Called with the list view rows of the matching
+          items, on the UI thread.
+
+        Returns:
+        None
+        """
+        current_list = os.path.normpath(
+            os.path.join(LIST_PATH, self.ids.list_title.text)
+        )
 
-    def rename(self):
-        """Opens the search dialog."""
-        dialog = RenameDialog()
-        dialog.open_rename_dialog()
+        def find():
+            index = get_search_index(DOCUMENTS_PATH, [LIST_PATH, ARCHIVES_PATH])
+            index.ensure_synced()
+            results = []
+            for path, headline, _score in index.search(query):
+                directory, filename = os.path.split(path)
+                entry = get_index(directory).entry(filename)
+                if os.path.normpath(directory) != current_list:
+                    # Tell apart results from archives and other lists.
+                    headline = (
+                        f"{os.path.relpath(directory, DOCUMENTS_PATH)}: {headline}"
+                    )
+                results.append(
+                    {
+                        "text": headline,
+                        "yaml_path": path,
+                        "checked": bool(entry and entry.checked),
+                    }
+                )
+            return results
+
+        run_io(find, on_done=show_results, on_error=error_dialog("Search failed"))
 
     def reset_list(self):
         """Resets the items view."""
@@ -303,27 +356,66 @@ class ItemsScreen(Screen):
         self.manager.current = "edit_template_screen"
 
     def move_to_archive(self):
-        """Moves item to the archive section."""
-        items_to_remove = []
-        if self.view == "list":
-            items_to_remove = [
-                item
-                for item in self.md_list.children
-                if item.ids.check.icon == "checkbox-marked-outline"
-            ]
-        elif self.view == "archive":
-            items_to_remove = [
-                item
-                for item in self.md_list.children
-                if item.ids.check.icon == "checkbox-blank-outline"
-            ]
-        for item in items_to_remove:
-            item.archive_item()
-        self.refresh_view()
+        """Moves the checked items to the archive, or unchecked ones back."""
+        if self.view not in ("list", "archive"):
+            return
+        unarchive = self.view == "archive"
+        list_name = self.ids.list_title.text
+        # Search results may come from other lists and archives; they stay.
+        source = os.path.abspath(get_repository().list_dir(list_name, unarchive))
+        keep = []
+        move = []
+        for item in self.items_view.data:
+            in_source = os.path.dirname(os.path.abspath(item["yaml_path"])) == source
+            (move if in_source and item["checked"] != unarchive else keep).append(item)
+        if not move:
+            return
+
+        show_error = error_dialog("Items could not be moved")
+
+        def on_done(result):
+            _moved, failed = result
+            if failed:
+                self.refresh_view()
+                show_error(f"{len(failed)} failed, {failed[0][1]}")
+
+        def on_error(e):
+            self.refresh_view()
+            show_error(e)
+
+        # The moved rows are dropped from the view instead of reloading it.
+        self.items_view.data = keep
+        run_io(
+            get_repository().archive_items,
+            [item["yaml_path"] for item in move],
+            list_name,
+            unarchive,
+            on_done=on_done,
+            on_error=on_error,
+        )
 
     def rename_list(self):
         """Renames the list."""
         dialog = RenameDialog()
-        dialog.open_rename_dialog(
-            self.ids.list_title, TEMPLATE_PATH, LIST_PATH, ARCHIVES_PATH
-        )
+        title = self.ids.list_title
+
+        def rename(old_name, new_name):
+            show_error = error_dialog("List could not be renamed")
+
+            def on_done(_result):
+                # Saved filters follow the list.
+                self.filters.rename_list(old_name, new_name)
+
+            def on_error(e):
+                title.text = old_name
+                show_error(e)
+
+            run_io(
+                get_repository().rename_list,
+                old_name,
+                new_name,
+                on_done=on_done,
+                on_error=on_error,
+            )
+
+        dialog.open_rename_dialog(title, rename)
@@ -1,13 +1,12 @@
 """Main Screen"""
 
+import os
+
 from kivy.uix.screenmanager import Screen
 
 from components.lists import ListOfLists
 from components.dialogs import SearchDialog
-from utils import (
-    LIST_PATH,
-    get_folder_list,
-)
+from utils import LIST_PATH, get_repository
 
 
 class MainScreen(Screen):
@@ -16,12 +15,15 @@ class MainScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.dialog = None
+        self.lists_mtime_ns = None
+        self.list_widgets = {}
 
     def on_enter(self, *args):
         "Refreshes list on enter"
         try:
             self.reset_list()
-        except AttributeError:
+        except (AttributeError, OSError):
+            # the lists folder is created after the first frame on first run
             pass
 
     def search(self):
@@ -29,12 +31,42 @@ class MainScreen(Screen):
         dialog = SearchDialog()
         dialog.open_search_dialog(self.ids.list_container)
 
-    def reset_list(self):
-        """Resets to the full list view."""
-        self.ids.list_container.clear_widgets()
-        folder_list = get_folder_list(LIST_PATH)
+    def scan_lists(self) -> None:
+        """Updates the list widgets, skipping the scan if nothing changed."""
+        repository = get_repository()
+        mtime_ns = repository.lists_mtime_ns()
+        if mtime_ns == self.lists_mtime_ns:
+            return
+        folder_list = repository.list_names()
 
+        for list_item in self.list_widgets.keys() - set(folder_list):
+            del self.list_widgets[list_item]
         for list_item in folder_list:
-            add_list = ListOfLists()
-            add_list.ids.headline.text = list_item
-            self.ids.list_container.add_widget(add_list)
+            if list_item not in self.list_widgets:
+                add_list = ListOfLists()
+                add_list.ids.headline.text = list_item
+                self.list_widgets[list_item] = add_list
+        self.lists_mtime_ns = mtime_ns
+
+    def reset_list(self):
+        """Resets to the full list view, only adding or removing changes."""
+        self.scan_lists()
+        container = self.ids.list_container
+        rendered = set()
+        for widget in list(container.children):
+            name = widget.ids.headline.text
+            if self.list_widgets.get(name) is widget:
+                rendered.add(name)
+            else:
+                container.remove_widget(widget)
+        for name in sorted(self.list_widgets.keys() - rendered):
+            container.add_widget(self.list_widgets[name])
+
+    def on_file_changes(self, events):
+        """Adds or removes list widgets for lists changed outside the app."""
+        lists_root = os.path.normpath(LIST_PATH)
+        if any(
+            kind == "rescan" or os.path.normpath(os.path.dirname(path)) == lists_root
+            for kind, path in events
+        ):
+            self.reset_list()
@@ -1,21 +1,18 @@
 """New Item Screen"""
 
-from datetime import datetime
-
 from kivy.uix.screenmanager import Screen
 
 from kivymd.uix.menu import MDDropdownMenu
 from kivymd.uix.pickers import MDModalDatePicker
 from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
 
-from components.forms import NewItemForm
+from components.forms import FormPool, NewItemForm
 from utils import (
-    LIST_PATH,
-    TEMPLATE_PATH,
     change_screen,
-    open_yaml_file,
-    save_to_yaml,
+    error_dialog,
+    get_repository,
     list_items_to_dict,
+    run_io,
 )
 
 
@@ -24,12 +21,14 @@ class NewItemScreen(Screen):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.category_fields = []
         self.options = {}
         self.dropdown = MDDropdownMenu()
+        self.form_pool = FormPool(self.build_forms)
 
     def open_date_picker(self, text_field, instance):
         """Displays the date picker for date fields."""
+        if not instance:
+            return
         date_picker = MDModalDatePicker()
 
         def on_cancel(instance_date_picker):
@@ -40,8 +39,7 @@ class NewItemScreen(Screen):
             instance_date_picker.dismiss()
 
         date_picker.bind(on_ok=on_ok, on_cancel=on_cancel)
-        if instance:
-            date_picker.open()
+        date_picker.open()
 
     def show_dropdown(self, text_field, _instance):
         """Displays the Category field dropdown."""
@@ -65,19 +63,23 @@ class NewItemScreen(Screen):
 
     def on_enter(self, *args):
         """Displays all the items inside the list."""
-        template = open_yaml_file(f"{TEMPLATE_PATH}{self.ids.item_title.text}.yaml")
+        template = get_repository().read_template(self.ids.item_title.text)
+        self.options = {field.name: field.categories for field in template.fields}
+
+        # Forms are reused per template, only their values are reset.
+        self.ids.added_items.clear_widgets()
+        for form in self.form_pool.get(template.fields):
+            form.ids.new_field_value.text = ""
+            self.ids.added_items.add_widget(form)
 
-        for fields in template.values():
-            for field in fields:
-                self.add_widget_by_field_type(self.ids.added_items, field)
+    def build_forms(self, fields) -> list:
+        """Builds the form widgets of a template's fields."""
+        return [self.build_field_form(field) for field in fields]
 
-    def add_widget_by_field_type(self, placeholder, field):
-        """Builds widgets from template."""
-        field_name = field["field_name"]
-        field_type = field["type"]
-        field_categories = field.get("categories", [])
-        self.options[field_name] = field_categories
-        self.category_fields.append(field_name)
+    def build_field_form(self, field) -> NewItemForm:
+        """Builds the form widget of a template field, with its bindings."""
+        field_name = field.name
+        field_type = field.type
 
         add_field = NewItemForm()
 
@@ -97,8 +99,7 @@ class NewItemScreen(Screen):
 
         add_field.ids.field_type_icon.icon = icon
         add_field.ids.helper_text.text = field_name
-
-        placeholder.add_widget(add_field)
+        return add_field
 
     def on_save(self):
         """Saves the item as a yaml file"""
@@ -113,13 +114,18 @@ class NewItemScreen(Screen):
             return
 
         # Save as yaml. Use timestamp as suffix for the filenames.
-        try:
-            title = self.ids.item_title.text
-            new_date = datetime.now().strftime("%Y-%m-%d %H%M%S")
-            yaml_file_path = f"{LIST_PATH}{title}/{title}_{new_date}.yaml"
-            save_to_yaml(yaml_file_path, mapped_values)
-            change_screen("items_screen")
-        except OSError as e:
-            MDDialog(
-                MDDialogSupportingText(text=f"Error saving note: {str(e)}.")
-            ).open()
+        repository = get_repository()
+        yaml_file_path = repository.new_item_path(self.ids.item_title.text)
+        run_io(
+            repository.write_item,
+            yaml_file_path,
+            mapped_values,
+            on_done=self.refresh_items,
+            on_error=error_dialog("Error saving note"),
+        )
+        change_screen("items_screen")
+
+    def refresh_items(self, _result=None):
+        """Shows a saved item once written, if the items screen is open."""
+        if self.manager.current == "items_screen":
+            self.manager.get_screen("items_screen").refresh_view()
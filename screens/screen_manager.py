@@ -0,0 +1,66 @@
+"""Screen manager building screens on first use."""
+
+import logging
+import importlib
+import time
+
+from kivy.uix.screenmanager import ScreenManager
+
+from storage import metrics
+
+logger = logging.getLogger(__name__)
+
+# Screen name -> (module, class). Modules are only imported when needed.
+SCREENS = {
+    "main_screen": ("screens.main_screen", "MainScreen"),
+    "template_create_screen": ("screens.template_create_screen", "TemplateCreateScreen"),
+    "items_screen": ("screens.items_screen", "ItemsScreen"),
+    "new_item_screen": ("screens.new_item_screen", "NewItemScreen"),
+    "view_item_screen": ("screens.view_item_screen", "ViewItemScreen"),
+    "edit_template_screen": ("screens.edit_template_screen", "EditTemplateScreen"),
+}
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager that instantiates registered screens on first access."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.factories = {}
+
+    def register(self, name: str, module: str, class_name: str) -> None:
+        """Registers a screen factory under a screen name."""
+        self.factories[name] = (module, class_name)
+
+    def build_screen(self, name: str):
+        """Imports and instantiates a registered screen."""
+        module, class_name = self.factories.pop(name)
+        start_ns = time.perf_counter_ns()
+        screen_cls = getattr(importlib.import_module(module), class_name)
+        screen = screen_cls(name=name)
+        self.add_widget(screen)
+        duration_ns = time.perf_counter_ns() - start_ns
+        metrics.record("screen_build", duration_ns)
+        logger.debug("Built %s in %.1f ms", name, duration_ns / 1e6)
+        return screen
+
+    def build_all(self) -> None:
+        """Builds every registered screen up front."""
+        for name in list(self.factories):
+            self.build_screen(name)
+
+    def built_screen(self, name: str):
+        """Returns a screen if it was built already, without building it."""
+        if name in self.factories or not super().has_screen(name):
+            return None
+        return super().get_screen(name)
+
+    def get_screen(self, name):
+        """Returns a screen, building it first if it was not built yet."""
+        if name in self.factories:
+            return self.build_screen(name)
+        return super().get_screen(name)
+
+    def has_screen(self, name):
+        """Whether a screen is registered, built or not."""
+        return name in self.factories or super().has_screen(name)
@@ -1,18 +1,15 @@
 """Template Creation Screen"""
 
-import os
-
 from kivy.uix.screenmanager import Screen
 
 from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
 
 from components.forms import NewFieldForm
 from utils import (
-    LIST_PATH,
-    TEMPLATE_PATH,
     change_screen,
-    get_folder_list,
-    save_to_yaml,
+    error_dialog,
+    get_repository,
+    run_io,
 )
 
 
@@ -38,7 +35,8 @@ class TemplateCreateScreen(Screen):
         fields = []
         template = {}
 
-        folder_list = get_folder_list(LIST_PATH)
+        repository = get_repository()
+        folder_list = repository.list_names()
 
         # Handle some commor errors.
         if not md_boxlayouts.children:
@@ -67,8 +65,11 @@ class TemplateCreateScreen(Screen):
             name = widget.ids.name.text
             typ = widget.ids.category_text.text
             if typ not in ["Text", "Number", "Date"]:
-                categories = typ.strip("[]")
-                categories = categories.split(",")
+                categories = [
+                    category.strip()
+                    for category in typ.strip("[]").split(",")
+                    if category.strip()
+                ]
                 field = {
                     "field_name": name,
                     "type": "Category",
@@ -83,13 +84,11 @@ class TemplateCreateScreen(Screen):
         template[template_name] = fields[::-1]  # reverse list
 
         # Save template as yaml
-        yaml_file_path = f"{TEMPLATE_PATH}{template_name}.yaml"
-        try:
-            save_to_yaml(yaml_file_path, template)
-            print(f"YAML file '{yaml_file_path}' has been created successfully.")
-            os.makedirs(LIST_PATH + self.ids.list_name.text, exist_ok=True)
-            change_screen("main_screen")
-        except OSError as e:
-            MDDialog(
-                MDDialogSupportingText(text=f"Error saving Template: {str(e)}.")
-            ).open()
+        run_io(
+            repository.create_list,
+            template_name,
+            template,
+            on_done=lambda _: self.manager.get_screen("main_screen").reset_list(),
+            on_error=error_dialog("Error saving Template"),
+        )
+        change_screen("main_screen")
@@ -5,43 +5,69 @@ import os
 from kivymd.uix.selectioncontrol import MDCheckbox
 from kivymd.uix.textfield import MDTextField, MDTextFieldHelperText
 
+from components.forms import FormPool
 from screens.new_item_screen import NewItemScreen
 from utils import (
     change_screen,
-    open_yaml_file,
-    save_to_yaml,
+    error_dialog,
+    get_repository,
     list_items_to_dict,
+    run_io,
 )
 
 
 class ViewItemScreen(NewItemScreen):
     """Item View screen."""
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.view_pool = FormPool(self.build_view_forms)
+
     def on_enter(self, *args):
         """Loads the yaml file fields into UI."""
         self.ids.added_items.clear_widgets()
         self.ids.display_title.text = os.path.basename(self.ids.item_title.text)
 
         yaml_file_path = f"{self.ids.item_title.text}.yaml"
-        item_dict = open_yaml_file(yaml_file_path)
+        item_dict = get_repository().read_item(yaml_file_path)
+
+        # Items with the same keys share their widgets, rebound to new values.
+        widgets = self.view_pool.get(tuple(item_dict))
+        for widget, value in zip(widgets, item_dict.values()):
+            if isinstance(widget, MDCheckbox):
+                widget.active = bool(value)
+            else:
+                widget.text = "" if value is None else str(value)
+            self.ids.added_items.add_widget(widget)
 
-        for key, value in item_dict.items():
+    def build_view_forms(self, keys) -> list:
+        """Builds the field widgets of an item with the given keys."""
+        widgets = []
+        for key in keys:
             if key == "checked":
-                add_field = MDCheckbox(active=value, disabled=True)
+                widgets.append(MDCheckbox(disabled=True))
             else:
-                add_field = MDTextField(
-                    MDTextFieldHelperText(text=key, mode="persistent"),
-                    mode="outlined",
+                widgets.append(
+                    MDTextField(
+                        MDTextFieldHelperText(text=key, mode="persistent"),
+                        mode="outlined",
+                    )
                 )
-                add_field.text = value
-            self.ids.added_items.add_widget(add_field)
+        return widgets
 
     def on_save(self):
         """Saves the changes in the field values to the same yaml."""
-        if os.path.exists(f"{self.ids.item_title.text}.yaml"):
-            all_items = self.ids.added_items.children
-            mapped_values = list_items_to_dict(all_items)
+        repository = get_repository()
+        path = f"{self.ids.item_title.text}.yaml"
+        mapped_values = list_items_to_dict(self.ids.added_items.children)
+
+        def save():
+            if repository.item_exists(path):
+                repository.write_item(path, mapped_values)
 
-            # Save as yaml
-            save_to_yaml(f"{self.ids.item_title.text}.yaml", mapped_values)
+        run_io(
+            save,
+            on_done=self.refresh_items,
+            on_error=error_dialog("Item could not be saved"),
+        )
         change_screen("items_screen")
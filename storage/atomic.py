@@ -0,0 +1,85 @@
+"""Crash safe file writes.
+
+Files are written to a hidden temporary file next to the target and renamed
+over it, so a crash leaves either the old or the new content, never a
+truncated file. How hard writes are pushed to the disk is set by the fsync
+policy:
+
+- "none": leave it to the OS.
+- "file": fsync the file before renaming it into place (default).
+- "full": also fsync the directory after the rename.
+"""
+
+import os
+import logging
+
+from storage import metrics
+
+FSYNC_POLICIES = ("none", "file", "full")
+
+logger = logging.getLogger(__name__)
+
+# Holds the current policy, set once at startup.
+_SETTINGS = {"fsync": "file"}
+
+
+def set_fsync_policy(policy: str) -> None:
+    """Sets the fsync policy used by atomic writes and log appends."""
+    if policy not in FSYNC_POLICIES:
+        logger.warning(
+            "Unknown fsync policy %r, keeping %r", policy, _SETTINGS["fsync"]
+        )
+        return
+    _SETTINGS["fsync"] = policy
+
+
+def fsync_policy() -> str:
+    """Returns the current fsync policy."""
+    return _SETTINGS["fsync"]
+
+
+def sync_file(file) -> None:
+    """Flushes an open file and fsyncs it, if the policy asks for it."""
+    file.flush()
+    if _SETTINGS["fsync"] != "none":
+        os.fsync(file.fileno())
+
+
+def sync_directory(directory: str) -> None:
+    """Fsyncs a directory entry list, if the policy asks for it."""
+    if _SETTINGS["fsync"] != "full" or not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, text: str) -> None:
+    """
+    Summary:
+    Replaces a file with new text through a temporary file.
+
+    Parameters:
+    - path (str): The file path.
+    - text (str): The new content.
+
+    Returns:
+    None
+    """
+    directory, name = os.path.split(path)
+    # Hidden, so list scans skip it if a crash leaves it behind.
+    temp_path = os.path.join(directory, f".{name}.tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+            sync_file(file)
+        os.replace(temp_path, path)
+        metrics.count("files_written")
+        metrics.count("bytes_written", len(text))
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    sync_directory(directory)
@@ -0,0 +1,51 @@
+"""Yaml storage codec.
+
+Uses the libyaml C loader and dumper when PyYAML was built with them and
+falls back to the pure Python implementation otherwise.
+"""
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+    LIBYAML = False
+
+YAMLError = yaml.YAMLError
+
+
+def load_yaml(stream, loader=SafeLoader):
+    """
+    Summary:
+    Parses a yaml document.
+
+    Parameters:
+    - stream (str | file): The yaml text or an open file.
+    - loader (yaml.Loader): The loader class, defaults to the fastest one.
+
+    Returns:
+    The parsed python object.
+    """
+    return yaml.load(stream, Loader=loader)
+
+
+def dump_yaml(data, stream=None, dumper=SafeDumper):
+    """
+    Summary:
+    Serializes a python object to yaml, keeping the key order.
+
+    Parameters:
+    - data: A python object.
+    - stream (file): An open file. If None the yaml text is returned.
+    - dumper (yaml.Dumper): The dumper class, defaults to the fastest one.
+
+    Returns:
+    The yaml text if no stream was given, else None.
+    """
+    return yaml.dump(
+        data, stream, Dumper=dumper, default_flow_style=False, sort_keys=False
+    )
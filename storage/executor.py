@@ -0,0 +1,119 @@
+"""Background executor for file operations.
+
+File operations are queued to a single worker thread, so the UI thread never
+waits on storage and operations on the same item run in the order they were
+submitted. Results and errors are handed back through a deliver function,
+which the app sets to schedule them on the UI thread.
+
+Repeated writes to the same item can be coalesced: they wait a short while
+and only the last one submitted in that window runs.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Seconds a coalesced write waits for a newer write of the same item.
+COALESCE_DELAY = 0.3
+
+logger = logging.getLogger(__name__)
+
+
+def _call(fn) -> None:
+    fn()
+
+
+class IOExecutor:
+    """Runs file operations off the UI thread, one at a time, in order."""
+
+    def __init__(self, deliver=_call, delay: float = COALESCE_DELAY):
+        """
+        Parameters:
+        - deliver (fn): Called with a no argument function to run on the UI
+          thread, e.g. through Clock.schedule_once.
+        - delay (float): The coalescing window, in seconds.
+        """
+        self.deliver = deliver
+        self.delay = delay
+        # One worker keeps submissions ordered, so a check quickly followed
+        # by an uncheck of the same item can never be written the other way.
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="lister-io")
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> (timer, fn, args, on_done, on_error)
+
+    def _queue(self, fn, args, on_done, on_error):
+        def run():
+            try:
+                result = fn(*args)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                if on_error is None:
+                    logger.error("Background %s failed: %s", fn.__name__, e)
+                else:
+                    self.deliver(lambda: on_error(e))
+                raise
+            if on_done is not None:
+                self.deliver(lambda: on_done(result))
+            return result
+
+        return self.executor.submit(run)
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        """
+        Summary:
+        Queues a file operation, after any coalesced writes still waiting.
+
+        Parameters:
+        - fn (fn): The operation, called with args on the worker thread.
+        - on_done (fn): Called with the result, on the UI thread.
+        - on_error (fn): Called with the raised exception, on the UI thread.
+          Errors without a handler are logged.
+
+        Returns:
+        A concurrent.futures.Future of the result.
+        """
+        with self.lock:
+            self._flush(list(self.pending))
+            return self._queue(fn, args, on_done, on_error)
+
+    def submit_coalesced(self, key, fn, *args, on_done=None, on_error=None):
+        """
+        Summary:
+        Queues a write after the coalescing delay, replacing a write with
+        the same key that is still waiting. Only the callbacks of the write
+        that runs are called.
+
+        Parameters:
+        - key: What the write is about, usually the item path.
+        - fn (fn): The operation, called with args on the worker thread.
+        - on_done (fn): Called with the result, on the UI thread.
+        - on_error (fn): Called with the raised exception, on the UI thread.
+
+        Returns:
+        None
+        """
+        timer = threading.Timer(self.delay, self.flush, [key])
+        timer.daemon = True
+        with self.lock:
+            replaced = self.pending.pop(key, None)
+            if replaced is not None:
+                replaced[0].cancel()
+            self.pending[key] = (timer, fn, args, on_done, on_error)
+        timer.start()
+
+    def _flush(self, keys: list) -> None:
+        # Called with the lock held, so nothing can be queued in between.
+        for key in keys:
+            if key in self.pending:
+                timer, fn, args, on_done, on_error = self.pending.pop(key)
+                timer.cancel()
+                self._queue(fn, args, on_done, on_error)
+
+    def flush(self, key=None) -> None:
+        """Queues the waiting coalesced writes, or only the one of key."""
+        with self.lock:
+            self._flush(list(self.pending) if key is None else [key])
+
+    def shutdown(self) -> None:
+        """Runs the waiting writes and waits for the queued operations."""
+        self.flush()
+        self.executor.shutdown(wait=True)
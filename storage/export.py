@@ -0,0 +1,255 @@
+"""Streaming list export.
+
+Rows are written as the items are parsed, so memory use does not grow with
+the size of the list.
+"""
+
+import os
+import csv
+import json
+import logging
+from functools import partial
+
+from storage.codec import YAMLError, load_yaml
+from storage.formats import EXPORT_FORMATS, encode_record
+from storage.index import get_index
+from storage.loader import load_items
+from storage.log_store import read_item_text
+from storage.templates import read_template_fields
+
+FILE_FIELD = "File"
+CACHE_DIR = ".cache"
+CACHE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def template_schema(template_path: str) -> tuple:
+    """
+    Summary:
+    Returns the fields declared in a list template.
+
+    Parameters:
+    - template_path (str): The template yaml path.
+
+    Returns:
+    A tuple of (field name, field type) pairs, empty if the template
+    can't be read.
+    """
+    return tuple(
+        (field.name, field.type) for field in read_template_fields(template_path)
+    )
+
+
+def template_fields(template_path: str) -> list:
+    """Returns the field names declared in a list template."""
+    return [name for name, _ in template_schema(template_path)]
+
+
+def _top_level_keys(path: str) -> list:
+    """Reads the top level keys of an item without building the item."""
+    keys = []
+    text = read_item_text(path)
+    for line in text.splitlines():
+        if not line.strip() or line[0] in " \t-#.":
+            continue
+        if line[0] in "'\"?":
+            # Quoted keys may contain colons, let yaml sort them out.
+            parsed = load_yaml(line)
+            if not isinstance(parsed, dict):
+                return list(load_yaml(text))
+            keys.extend(parsed)
+            continue
+        keys.append(line.split(":", 1)[0].rstrip())
+    return keys
+
+
+def scan_fields(directory: str, names: list, fieldnames=None) -> list:
+    """
+    Summary:
+    Returns the union of the fields used by the items of a directory, in
+    order of first appearance.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - names (list): The item file names.
+    - fieldnames (list): Known fields (e.g. from the template) to put first.
+
+    Returns:
+    A list of field names.
+    """
+    fields = dict.fromkeys(fieldnames or [])
+    for name in names:
+        try:
+            fields.update(dict.fromkeys(_top_level_keys(os.path.join(directory, name))))
+        except (OSError, YAMLError, TypeError) as e:
+            logger.error("Error scanning file %s: %s", name, e)
+    return list(fields)
+
+
+def export_csv(directory, names, output_path, fieldnames, progress=None) -> int:
+    """
+    Summary:
+    Writes the items of a directory to a csv file, one row at a time.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - names (list): The item file names.
+    - output_path (str): The csv file path.
+    - fieldnames (list): The csv columns. A "File" column is appended.
+    - progress (fn): Called with (done, total) while exporting.
+
+    Returns:
+    The number of exported rows.
+    """
+    total = len(names)
+    rows = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(
+            csvfile, fieldnames=[*fieldnames, FILE_FIELD], extrasaction="ignore"
+        )
+        writer.writeheader()
+        for done, (name, item) in enumerate(load_items(directory, names), 1):
+            if isinstance(item, dict):
+                item[FILE_FIELD] = os.path.join(directory, name)
+                writer.writerow(item)
+                rows += 1
+            if progress and (done % 500 == 0 or done == total):
+                progress(done, total)
+    return rows
+
+
+def _read_meta(cache_path: str, schema: tuple) -> dict:
+    """Returns the record cache metadata, or {} if it is missing or stale."""
+    try:
+        with open(f"{cache_path}.meta", encoding="utf-8") as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if meta.get("version") != CACHE_VERSION or meta.get("schema") != [
+        list(field) for field in schema
+    ]:
+        return {}
+    return meta
+
+
+def _read_cache(cache_path: str):
+    """Iterates over the (name, mtime_ns, size, record json) cache lines."""
+    try:
+        file = open(cache_path, encoding="utf-8")
+    except OSError:
+        return
+    with file:
+        for line in file:
+            key, record = line.rstrip("\n").split("\t", 1)
+            name, mtime_ns, size = json.loads(key)
+            yield name, mtime_ns, size, record
+
+
+def _merge_cache(cache_path: str, names: list, entries: dict):
+    """Yields (name, cached record or None) for every name, in order."""
+    cached = _read_cache(cache_path)
+    current = next(cached, None)
+    for name in names:
+        while current is not None and current[0] < name:
+            current = next(cached, None)
+        entry = entries[name]
+        if (
+            current is not None
+            and current[0] == name
+            and current[1:3] == (entry.mtime_ns, entry.size)
+        ):
+            yield name, current[3]
+        else:
+            yield name, None
+    cached.close()
+
+
+def refresh_records(directory: str, schema: tuple, cache_path: str) -> list:
+    """
+    Summary:
+    Brings the typed record cache of a directory up to date. Only items
+    added or changed since the last export are parsed and encoded again.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - schema (tuple): (field name, field type) pairs from the template.
+    - cache_path (str): The record cache file path.
+
+    Returns:
+    The list of fields used by the records.
+    """
+    entries = get_index(directory).entries()
+    names = sorted(entries)
+    meta = _read_meta(cache_path, schema)
+    cached_path = cache_path if meta else os.devnull
+    fields = dict.fromkeys([name for name, _ in schema])
+    fields.update(dict.fromkeys(meta.get("fields", [])))
+
+    # The cache and the names are both sorted, so each pass is a merge.
+    changed = [
+        name
+        for name, record in _merge_cache(cached_path, names, entries)
+        if record is None
+    ]
+    encoded = load_items(directory, changed, partial(encode_record, schema))
+
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        for name, record in _merge_cache(cached_path, names, entries):
+            if record is None:
+                _, record = next(encoded)
+                if record is None:
+                    continue
+                record = json.loads(record)
+                record[FILE_FIELD] = os.path.join(directory, name)
+                fields.update(dict.fromkeys(record))
+                record = json.dumps(record, ensure_ascii=False, default=str)
+            entry = entries[name]
+            file.write(f"{json.dumps([name, entry.mtime_ns, entry.size])}\t{record}\n")
+    os.replace(temp_path, cache_path)
+
+    fields.pop(FILE_FIELD, None)
+    fields = [*fields, FILE_FIELD]
+    with open(f"{cache_path}.meta", "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "version": CACHE_VERSION,
+                "schema": [list(field) for field in schema],
+                "fields": fields,
+            },
+            file,
+        )
+    return fields
+
+
+def export_records(
+    directory, template_path, exports_path, output_name, export_format
+) -> str:
+    """
+    Summary:
+    Exports a directory in one of the typed formats of EXPORT_FORMATS.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - template_path (str): The list template path.
+    - exports_path (str): The exports folder.
+    - output_name (str): The export file name, without extension.
+    - export_format (str): A key of EXPORT_FORMATS.
+
+    Returns:
+    The export file path.
+    """
+    writer = EXPORT_FORMATS[export_format]
+    schema = template_schema(template_path)
+    cache_dir = os.path.join(exports_path, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{output_name}.records")
+    fields = refresh_records(directory, schema, cache_path)
+
+    types = dict(schema)
+    columns = [(field, types.get(field, "Text")) for field in fields]
+    output_path = os.path.join(exports_path, output_name + writer.extension)
+    records = (record for *_, record in _read_cache(cache_path))
+    writer.write(records, columns, output_path)
+    return output_path
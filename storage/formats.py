@@ -0,0 +1,221 @@
+"""Typed export formats.
+
+Items are first encoded into typed records using the field types declared
+in the list template ("Text", "Number", "Date", "Category"), then written
+by one of the formats in EXPORT_FORMATS.
+
+Columnar layout (little endian)::
+
+    b"LSTC" | version u16 | rows u32 | columns u16
+    per column:
+        name length u16 | name utf-8 | type code u8
+        presence bitmap, (rows + 7) // 8 bytes, 1 = value present
+        payload:
+            N  float64 * rows
+            D  int32 * rows, days since 1970-01-01
+            B  bitmap, (rows + 7) // 8 bytes
+            C  categories u16 | (length u16 | utf-8) per category
+               | uint16 codes * rows
+            T  uint32 offsets * (rows + 1) | utf-8 blob
+
+Values that do not match the declared type are stored as missing in the
+columnar format and kept as text in JSON Lines.
+"""
+
+import json
+import struct
+from array import array
+from datetime import date
+from typing import Callable, NamedTuple
+
+MAGIC = b"LSTC"
+VERSION = 1
+EPOCH = date(1970, 1, 1)
+MAX_CATEGORIES = 0xFFFF
+
+TYPE_CODES = {"Text": b"T", "Number": b"N", "Date": b"D", "Category": b"C"}
+BOOL_CODE = b"B"
+
+
+def to_number(value):
+    """Returns value as an int or float, or None if it isn't a number."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        text = str(value).strip()
+        return int(text) if text.lstrip("+-").isdigit() else float(text)
+    except ValueError:
+        return None
+
+
+def to_date(value):
+    """Returns value as a date, or None if it isn't an ISO date."""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+def encode_value(value, field_type):
+    """
+    Summary:
+    Converts a raw item value to its json typed value.
+
+    Parameters:
+    - value: The value read from the item yaml.
+    - field_type (str): The template field type.
+
+    Returns:
+    A json serializable value. Values not matching the type stay text.
+    """
+    if value is None or value == "":
+        return None
+    if field_type == "Number":
+        number = to_number(value)
+        return str(value) if number is None else number
+    if field_type == "Date":
+        day = to_date(value)
+        return str(value) if day is None else day.isoformat()
+    if isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
+
+
+def encode_record(schema: tuple, item: dict, _stat=None):
+    """
+    Summary:
+    Encodes an item as a typed json record.
+
+    Parameters:
+    - schema (tuple): (field name, field type) pairs from the template.
+    - item (dict): The parsed item yaml.
+
+    Returns:
+    The record json text, or None if the item is not a mapping.
+    """
+    if not isinstance(item, dict):
+        return None
+    types = dict(schema)
+    record = {
+        key: (
+            bool(value)
+            if key == "checked"
+            else encode_value(value, types.get(key, "Text"))
+        )
+        for key, value in item.items()
+    }
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+class ExportFormat(NamedTuple):
+    """An export format: its file extension and its write(records, columns,
+    path) function."""
+
+    extension: str
+    write: Callable
+
+
+def write_json_lines(records, _columns, path):
+    """Writes one typed json record per line, without re-encoding them."""
+    with open(path, "w", encoding="utf-8") as file:
+        for line in records:
+            file.write(line)
+            file.write("\n")
+
+
+def _bitmap(flags) -> bytes:
+    bits = bytearray((len(flags) + 7) // 8)
+    for row, flag in enumerate(flags):
+        if flag:
+            bits[row >> 3] |= 1 << (row & 7)
+    return bytes(bits)
+
+
+def _short_string(text: str) -> bytes:
+    data = text.encode("utf-8")[:0xFFFF]
+    return struct.pack("<H", len(data)) + data
+
+
+def _encode_column(values: list, code: bytes) -> tuple:
+    """Returns the (type code, payload) of a column."""
+    present = []
+    if code == b"N":
+        numbers = array("d")
+        for value in values:
+            number = to_number(value)
+            present.append(number is not None)
+            numbers.append(0.0 if number is None else float(number))
+        return code, _bitmap(present) + numbers.tobytes()
+    if code == b"D":
+        days = array("i")
+        for value in values:
+            day = to_date(value)
+            present.append(day is not None)
+            days.append(0 if day is None else (day - EPOCH).days)
+        return code, _bitmap(present) + days.tobytes()
+    if code == BOOL_CODE:
+        present = [value is not None for value in values]
+        return code, _bitmap(present) + _bitmap([bool(v) for v in values])
+    if code == b"C":
+        categories = {}
+        codes = array("H")
+        for value in values:
+            present.append(value is not None)
+            if value is None:
+                codes.append(0)
+                continue
+            category = categories.setdefault(str(value), len(categories))
+            if category >= MAX_CATEGORIES:
+                return _encode_column(values, b"T")
+            codes.append(category)
+        header = struct.pack("<H", len(categories)) + b"".join(
+            _short_string(category) for category in categories
+        )
+        return code, _bitmap(present) + header + codes.tobytes()
+
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        present.append(value is not None)
+        if value is not None:
+            blob += str(value).encode("utf-8")
+        offsets.append(len(blob))
+    return b"T", _bitmap(present) + offsets.tobytes() + bytes(blob)
+
+
+def write_columnar(records, columns, path):
+    """
+    Summary:
+    Writes the records column by column, as a compact binary columnar file
+    using the template field types.
+
+    Parameters:
+    - records (iter): Typed record json lines.
+    - columns (list): (field name, field type) pairs to write.
+    - path (str): The output file path.
+    """
+    names = [name for name, _ in columns]
+    values = {name: [] for name in names}
+    rows = 0
+    for line in records:
+        record = json.loads(line)
+        for name in names:
+            values[name].append(record.get(name))
+        rows += 1
+
+    with open(path, "wb") as file:
+        file.write(MAGIC + struct.pack("<HIH", VERSION, rows, len(columns)))
+        for name, field_type in columns:
+            code = BOOL_CODE if name == "checked" else TYPE_CODES.get(field_type)
+            code, payload = _encode_column(values.pop(name), code or b"T")
+            file.write(_short_string(name) + code + payload)
+
+
+EXPORT_FORMATS = {
+    "jsonl": ExportFormat(".jsonl", write_json_lines),
+    "columnar": ExportFormat(".lstc", write_columnar),
+}
@@ -0,0 +1,485 @@
+"""Per-list metadata index.
+
+Every list directory keeps a hidden sidecar file with the headline, checked
+flag, mtime and size of each item, so the list view can be built from a
+single read instead of parsing every item yaml.
+
+The UI thread, the I/O worker and the export thread all use the indexes,
+so each index changes its entries under its own lock and hands out copies.
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import NamedTuple
+
+from storage.loader import load_items, parse_item
+from storage.listing import LISTINGS, directory_mtime_ns, is_item_file
+from storage.log_store import get_store, stat_item
+
+INDEX_FILENAME = ".index.json"
+INDEX_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class IndexEntry(NamedTuple):
+    """Cached metadata of a single item file."""
+
+    headline: str
+    checked: bool
+    mtime_ns: int
+    size: int
+
+
+def entry_from_item(item: dict, stat: os.stat_result) -> IndexEntry:
+    """
+    Summary:
+    Builds an index entry from a parsed item.
+
+    Parameters:
+    - item (dict): The parsed item yaml.
+    - stat (os.stat_result): The item file stat.
+
+    Returns:
+    An IndexEntry.
+    """
+    headline = ""
+    checked = False
+    if isinstance(item, dict) and item:
+        headline = str(next(iter(item.values())))
+        checked = bool(item.get("checked", False))
+    return IndexEntry(headline, checked, stat.st_mtime_ns, stat.st_size)
+
+
+class ListIndex:
+    """Metadata index of a single list (or archive) directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_FILENAME)
+        self.dir_mtime_ns = None
+        self.items = {}
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    def _dir_mtime_ns(self):
+        return directory_mtime_ns(self.directory)
+
+    def _read(self):
+        """Reads the sidecar file. Returns False if missing or unusable."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION:
+            return False
+        self.dir_mtime_ns = data.get("dir_mtime_ns")
+        self.items = {
+            name: IndexEntry(*values) for name, values in data["items"].items()
+        }
+        return True
+
+    def save(self):
+        """Writes the sidecar file."""
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        # The sidecar is created once and then rewritten in place, so saving
+        # it does not change the directory mtime recorded inside it.
+        if not os.path.exists(self.path):
+            with open(self.path, "a", encoding="utf-8"):
+                pass
+        self.dir_mtime_ns = self._dir_mtime_ns()
+        data = {
+            "version": INDEX_VERSION,
+            "dir_mtime_ns": self.dir_mtime_ns,
+            "items": {name: list(entry) for name, entry in self.items.items()},
+        }
+        try:
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(data, file, separators=(",", ":"))
+        except OSError as e:
+            logger.error("Could not write index %s: %s", self.path, e)
+
+    def _stats(self) -> dict:
+        """Returns the stat of every item file, including logged items."""
+        stats = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if is_item_file(entry.name) and entry.is_file():
+                    stats[entry.name] = entry.stat()
+        store = get_store(self.directory)
+        if store is not None:
+            for name in store.names():
+                try:
+                    stats[name] = store.stat(name)
+                except FileNotFoundError:
+                    pass  # deleted by another thread meanwhile
+        return stats
+
+    def rescan(self):
+        """Reconciles the index with the directory contents."""
+        with self.lock:
+            self._rescan()
+
+    def _rescan(self):
+        stats = self._stats()
+        stale = []
+        items = {}
+        for name, stat in stats.items():
+            cached = self.items.get(name)
+            if (
+                cached
+                and cached.mtime_ns == stat.st_mtime_ns
+                and cached.size == stat.st_size
+            ):
+                items[name] = cached
+            else:
+                stale.append(name)
+
+        for name, entry in load_items(self.directory, stale, entry_from_item):
+            if entry is not None:
+                items[name] = entry
+
+        self.items = items
+        self._save()
+
+    def _load(self):
+        if not self.loaded:
+            self._read()
+            self.loaded = True
+
+    def _refresh(self):
+        """Loads the index, rescanning only if the directory changed."""
+        self._load()
+        if self.dir_mtime_ns != self._dir_mtime_ns():
+            self._rescan()
+
+    def entries(self) -> dict:
+        """
+        Summary:
+        Returns the up to date index entries, rescanning only if the
+        directory changed since the index was written.
+
+        Returns:
+        A copy of the dict of file names to IndexEntry.
+        """
+        with self.lock:
+            self._refresh()
+            return dict(self.items)
+
+    def entry(self, filename: str):
+        """Returns the up to date entry of an item, or None."""
+        with self.lock:
+            self._refresh()
+            return self.items.get(filename)
+
+    def entry_pages(self, page_size: int):
+        """
+        Summary:
+        Yields the index entries newest first, a page at a time, so the
+        first items can be shown before the rest are parsed. Cached entries cost nothing,
+        so a page only ends once page_size files had to be parsed; an up to
+        date index comes as a single page. The index is saved after the
+        last page.
+
+        Parameters:
+        - page_size (int): The number of files parsed per page.
+
+        Returns:
+        A generator of dicts of file names to IndexEntry, in order.
+        """
+        with self.lock:
+            names, cached = self._plan_pages()
+            if cached is None:
+                page = {name: self.items[name] for name in names}
+        if cached is None:
+            yield page
+            return
+
+        # Pages are parsed without the lock, which is not held between pages.
+        page = {}
+        stale = []
+        for name in names:
+            page[name] = cached.get(name)
+            if page[name] is None:
+                stale.append(name)
+            if len(stale) >= page_size:
+                yield self._load_page(page, stale)
+                page = {}
+                stale = []
+        if page or not names:
+            yield self._load_page(page, stale)
+        self.save()
+
+    def _plan_pages(self) -> tuple:
+        """
+        Returns the item names newest first, and a copy of the entries still
+        valid, None if the whole index is up to date.
+        """
+        self._load()
+        mtime_ns = self._dir_mtime_ns()
+        if self.dir_mtime_ns == mtime_ns:
+            names = LISTINGS.newest_first(
+                self.directory, mtime_ns, lambda: list(self.items)
+            )
+            return [name for name in names if name in self.items], None
+        stats = self._stats()
+        self.items = {
+            name: entry
+            for name, entry in self.items.items()
+            if name in stats
+            and (entry.mtime_ns, entry.size)
+            == (stats[name].st_mtime_ns, stats[name].st_size)
+        }
+        names = LISTINGS.newest_first(self.directory, mtime_ns, lambda: list(stats))
+        return names, dict(self.items)
+
+    def _load_page(self, page: dict, stale: list) -> dict:
+        for name, entry in load_items(self.directory, stale, entry_from_item):
+            if entry is not None:
+                page[name] = entry
+        with self.lock:
+            self.items.update(
+                (name, page[name]) for name in stale if page[name] is not None
+            )
+        return {name: entry for name, entry in page.items() if entry is not None}
+
+    def update_item(self, filename: str, item: dict):
+        """Updates the entry of a written item."""
+        with self.lock:
+            self._refresh()
+            try:
+                stat = stat_item(os.path.join(self.directory, filename))
+            except OSError:
+                return
+            self.items[filename] = entry_from_item(item, stat)
+            self._save()
+
+    def remove_item(self, filename: str):
+        """Removes the entry of a deleted or moved item."""
+        with self.lock:
+            self._refresh()
+            if self.items.pop(filename, None) is not None:
+                self._save()
+
+    def remove_items(self, filenames: list) -> dict:
+        """Removes the entries of moved items, returning them."""
+        with self.lock:
+            self._load()
+            # Taken before the rescan, which would drop the moved files.
+            removed = {
+                name: self.items[name] for name in filenames if name in self.items
+            }
+            self._refresh()
+            dropped = [name for name in filenames if self.items.pop(name, None)]
+            if dropped:
+                self._save()
+            return removed
+
+    def add_entries(self, entries: dict):
+        """Adds the entries of items moved in, so they are not re-parsed."""
+        with self.lock:
+            self._load()
+            self.items.update(entries)
+            # The rescan keeps the added entries whose mtime and size still match.
+            self._refresh()
+
+    def reload_items(self, filenames: list) -> dict:
+        """
+        Summary:
+        Re-reads items changed outside the app, saving the index once.
+
+        Parameters:
+        - filenames (list): The names of the possibly changed items.
+
+        Returns:
+        A dict of the names that really changed to their item, or None if
+        the item is gone.
+        """
+        with self.lock:
+            self._load()
+            store = get_store(self.directory)
+            changed = {}
+            for name in filenames:
+                path = os.path.join(self.directory, name)
+                cached = self.items.get(name)
+                parsed = None
+                try:
+                    stat = stat_item(path)
+                    if cached and (cached.mtime_ns, cached.size) == (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    ):
+                        continue  # e.g. written by the app itself
+                    parsed = parse_item(path, store)
+                except OSError:
+                    pass
+                if parsed is None:
+                    if self.items.pop(name, None) is not None:
+                        changed[name] = None
+                    continue
+                item, stat = parsed
+                self.items[name] = entry_from_item(item, stat)
+                changed[name] = item
+            if self.dir_mtime_ns == self._dir_mtime_ns():
+                if changed:
+                    self._save()
+            else:
+                # The rescan keeps the entries just read and saves the index.
+                self._rescan()
+            return changed
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(directory: str) -> ListIndex:
+    """
+    Summary:
+    Returns the shared index of a list directory.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+
+    Returns:
+    A ListIndex.
+    """
+    key = os.path.normpath(directory)
+    with _INDEXES_LOCK:
+        if key not in _INDEXES:
+            _INDEXES[key] = ListIndex(directory)
+        return _INDEXES[key]
+
+
+def _indexed(directory: str):
+    """Returns the directory index, or None if it has none yet."""
+    key = os.path.normpath(directory)
+    if key in _INDEXES:
+        return _INDEXES[key]
+    if os.path.exists(os.path.join(directory, INDEX_FILENAME)):
+        return get_index(directory)
+    return None
+
+
+_LISTENERS = []
+
+
+def add_listener(callback) -> None:
+    """
+    Summary:
+    Registers a callback(event, path, data) notified of item changes.
+
+    Events are "update" (data: the item dict), "remove", "move" (path: the
+    destination directory, data: the former paths of a batch of moved
+    items), "rename" (path: the old directory, data: the new one) and
+    "forget" (path: a deleted directory).
+
+    Parameters:
+    - callback (fn): The function to call.
+
+    Returns:
+    None
+    """
+    _LISTENERS.append(callback)
+
+
+def _notify(event: str, path: str, data=None) -> None:
+    for callback in _LISTENERS:
+        try:
+            callback(event, path, data)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Index listener failed on %s %s: %s", event, path, e)
+
+
+def index_item(path: str, item: dict) -> None:
+    """Records a saved item in its directory index, if there is one."""
+    directory, filename = os.path.split(path)
+    if not is_item_file(filename):
+        return
+    index = _indexed(directory)
+    if index is not None:
+        index.update_item(filename, item)
+    _notify("update", path, item)
+
+
+def unindex_item(path: str) -> None:
+    """Drops a removed item from its directory index, if there is one."""
+    directory, filename = os.path.split(path)
+    index = _indexed(directory)
+    if index is not None:
+        index.remove_item(filename)
+    _notify("remove", path)
+
+
+def move_items(sources: list, destination_dir: str) -> None:
+    """
+    Summary:
+    Updates the directory indexes after a batch of item files was moved,
+    saving each index once.
+
+    Parameters:
+    - sources (list): The former paths of the moved items.
+    - destination_dir (str): The folder they were moved to.
+
+    Returns:
+    None
+    """
+    by_directory = {}
+    for source in sources:
+        directory, filename = os.path.split(source)
+        by_directory.setdefault(directory, []).append(filename)
+    moved = {}
+    for directory, filenames in by_directory.items():
+        index = _indexed(directory)
+        if index is not None:
+            moved.update(index.remove_items(filenames))
+    destination_index = _indexed(destination_dir)
+    if destination_index is not None:
+        destination_index.add_entries(moved)
+    if sources:
+        _notify("move", destination_dir, list(sources))
+
+
+def reload_items(directory: str, filenames: list) -> list:
+    """
+    Summary:
+    Brings the index of a directory in step with items changed outside the
+    app, and notifies the listeners of the ones that really changed.
+
+    Parameters:
+    - directory (str): The list or archive directory.
+    - filenames (list): The names of the possibly changed items.
+
+    Returns:
+    The paths of the changed items.
+    """
+    changed = get_index(directory).reload_items(
+        [name for name in filenames if is_item_file(name)]
+    )
+    paths = []
+    for name, item in changed.items():
+        path = os.path.join(directory, name)
+        if item is None:
+            _notify("remove", path)
+        else:
+            _notify("update", path, item)
+        paths.append(path)
+    return paths
+
+
+def forget_directory(directory: str) -> None:
+    """Drops the cached index of a deleted directory."""
+    _INDEXES.pop(os.path.normpath(directory), None)
+    _notify("forget", directory)
+
+
+def rename_directory(old_directory: str, new_directory: str) -> None:
+    """Drops the cached index of a renamed directory."""
+    _INDEXES.pop(os.path.normpath(old_directory), None)
+    _notify("rename", old_directory, new_directory)
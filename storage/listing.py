@@ -0,0 +1,118 @@
+"""Item file listing and ordering.
+
+Item files are named "<list>_YYYY-MM-DD HHMMSS.yaml". Their timestamps are
+read at fixed offsets instead of through strptime, and files that do not
+follow the pattern sort after the others instead of failing. The newest
+first order of a directory is cached until its mtime changes.
+"""
+
+import os
+
+from storage.log_store import get_store, item_names
+
+# "YYYY-MM-DD HHMMSS", the suffix written by Repository.new_item_path.
+TIMESTAMP_LENGTH = 17
+SUFFIX = ".yaml"
+
+
+def is_item_file(filename: str) -> bool:
+    """Returns True for item yaml files, skipping hidden and foreign files."""
+    return not filename.startswith(".") and filename.endswith(SUFFIX)
+
+
+def list_item_files(directory: str) -> list:
+    """Returns the item file names of a list directory, including its log."""
+    names = [name for name in os.listdir(directory) if is_item_file(name)]
+    return names + item_names(directory)
+
+
+def directory_mtime_ns(directory: str) -> int:
+    """Returns the mtime of a list directory, or of its log if newer."""
+    # Log appends do not touch the directory, so count the log mtime too.
+    mtime_ns = os.stat(directory).st_mtime_ns
+    store = get_store(directory)
+    if store is not None:
+        mtime_ns = max(mtime_ns, os.stat(store.path).st_mtime_ns)
+    return mtime_ns
+
+
+def filename_timestamp(filename: str):
+    """
+    Summary:
+    Reads the timestamp of an item file name.
+
+    Parameters:
+    - filename (str): An item file name or path.
+
+    Returns:
+    The timestamp as a YYYYMMDDHHMMSS int, which sorts like the date, or
+    None if the name does not end in one.
+    """
+    stem = filename[: -len(SUFFIX)] if filename.endswith(SUFFIX) else filename
+    stamp = stem[-TIMESTAMP_LENGTH:]
+    if (
+        len(stem) <= TIMESTAMP_LENGTH
+        or stem[-TIMESTAMP_LENGTH - 1] != "_"
+        or stamp[4] != "-"
+        or stamp[7] != "-"
+        or stamp[10] != " "
+    ):
+        return None
+    digits = stamp[:4] + stamp[5:7] + stamp[8:10] + stamp[11:]
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    return int(digits)
+
+
+def _newest_first_key(filename: str) -> tuple:
+    stamp = filename_timestamp(filename)
+    return (stamp is not None, stamp or 0, filename)
+
+
+def newest_first(names: list) -> list:
+    """Orders item file names or paths by timestamp, newest first."""
+    return sorted(names, key=_newest_first_key, reverse=True)
+
+
+class ListingCache:
+    """Newest first orders of item names, kept per directory and mtime."""
+
+    def __init__(self):
+        self.orders = {}  # directory -> (mtime_ns, names)
+
+    def newest_first(self, directory: str, mtime_ns: int, list_names) -> list:
+        """
+        Summary:
+        Orders the item names of a directory newest first, reusing the last
+        order while the directory mtime stays the same.
+
+        Parameters:
+        - directory (str): The list directory.
+        - mtime_ns (int): Its current mtime, see directory_mtime_ns().
+        - list_names (fn): Returns its item file names, only called if the
+          cached order is out of date.
+
+        Returns:
+        The ordered names. The list is shared and must not be changed.
+        """
+        key = os.path.normpath(directory)
+        cached = self.orders.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        ordered = newest_first(list_names())
+        self.orders[key] = (mtime_ns, ordered)
+        return ordered
+
+    def forget(self, directory: str) -> None:
+        """Drops the cached order of a directory."""
+        self.orders.pop(os.path.normpath(directory), None)
+
+
+LISTINGS = ListingCache()
+
+
+def sorted_item_names(directory: str) -> list:
+    """Returns the item file names of a list directory, newest first."""
+    return LISTINGS.newest_first(
+        directory, directory_mtime_ns(directory), lambda: list_item_files(directory)
+    )
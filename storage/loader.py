@@ -0,0 +1,161 @@
+"""Bulk loader for cold list scans.
+
+Yaml parsing is CPU bound, so large directories are parsed in a process
+pool. Files are handed out in chunks to keep the pickling overhead low and
+results are returned chunk by chunk, in the order the files were given.
+
+The pool only pays off for whole-list scans: index rescans, the table view,
+search and mirror syncs and exports. A list view page (see
+ListIndex.entry_pages, 50 files by default) is far below the two workers'
+worth of files a pool needs, so it is parsed in process.
+
+Workers are forked from the running app, so they must not take any lock
+another thread could hold at fork time. They only open and parse plain
+files; lists kept in a log (see storage.log_store) are parsed in process.
+"""
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from storage import metrics
+from storage.codec import YAMLError, load_yaml
+from storage.log_store import get_store
+
+# Below this many files per worker a pool costs more than it saves.
+MIN_FILES_PER_WORKER = 200
+MAX_CHUNK_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count(file_count: int) -> int:
+    """
+    Summary:
+    Picks the number of worker processes for a scan.
+
+    Parameters:
+    - file_count (int): The number of files to parse.
+
+    Returns:
+    The worker count. 1 means parsing in the calling process.
+    """
+    cores = os.cpu_count() or 1
+    return max(1, min(cores, file_count // MIN_FILES_PER_WORKER))
+
+
+def chunk_size(file_count: int, workers: int) -> int:
+    """Returns a chunk size giving each worker a few chunks to balance load."""
+    return max(1, min(MAX_CHUNK_SIZE, -(-file_count // (workers * 4))))
+
+
+def parse_item(path: str, store=None):
+    """
+    Summary:
+    Parses an item file together with its stat.
+
+    Parameters:
+    - path (str): An item file path.
+    - store (LogStore): The log of the item directory, if it has one.
+
+    Returns:
+    A (item, stat) tuple, or None if the file could not be read.
+    """
+    try:
+        name = os.path.basename(path)
+        if store is not None and name in store.entries:
+            return load_yaml(store.read(name)), store.stat(name)
+        with open(path, encoding="utf-8") as file:
+            stat = os.fstat(file.fileno())
+            return load_yaml(file), stat
+    except (OSError, YAMLError) as e:
+        logger.error("Error processing file %s: %s", path, e)
+        return None
+
+
+def _parse_chunk(directory: str, names: list, transform, store=None) -> tuple:
+    """
+    Parses a chunk of files. Runs in the worker processes, so it returns
+    the parsed byte count for the caller to record. The store is only
+    passed in process, as reading it takes its lock.
+    """
+    records = []
+    parsed_bytes = 0
+    for name in names:
+        parsed = parse_item(os.path.join(directory, name), store)
+        if parsed is None:
+            records.append((name, None))
+        else:
+            parsed_bytes += parsed[1].st_size
+            records.append((name, transform(*parsed)))
+    return records, parsed_bytes
+
+
+def _counted(result: tuple) -> list:
+    records, parsed_bytes = result
+    metrics.count("files_read", len(records))
+    metrics.count("bytes_parsed", parsed_bytes)
+    return records
+
+
+def _item_only(item, _stat):
+    return item
+
+
+def _mp_context():
+    """
+    Prefers fork, as spawned or forkserver workers re-import the Kivy app
+    module. Forked workers take no locks, see _parse_chunk.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def iter_chunks(directory: str, names: list, transform=_item_only):
+    """
+    Summary:
+    Parses the given files of a directory and yields the records in chunks.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - names (list): The file names to parse.
+    - transform (fn): A module level function turning (item, stat) into the
+      record to return. It runs in the workers, so it should make the
+      record small.
+
+    Returns:
+    An iterator of lists of (file name, record) tuples. The record is None
+    for files that could not be parsed.
+    """
+    names = list(names)
+    workers = worker_count(len(names))
+    size = chunk_size(len(names), workers)
+    chunks = [names[i : i + size] for i in range(0, len(names), size)]
+    done = 0
+    store = get_store(directory)
+
+    if workers > 1 and store is None:
+        try:
+            with ProcessPoolExecutor(workers, mp_context=_mp_context()) as executor:
+                for result in executor.map(
+                    _parse_chunk,
+                    [directory] * len(chunks),
+                    chunks,
+                    [transform] * len(chunks),
+                ):
+                    done += 1
+                    yield _counted(result)
+        except (BrokenExecutor, ImportError, NotImplementedError, OSError) as e:
+            # Some platforms (e.g. Android) lack the multiprocessing primitives.
+            logger.debug("Process pool unavailable, parsing in process: %s", e)
+
+    for chunk in chunks[done:]:
+        yield _counted(_parse_chunk(directory, chunk, transform, store))
+
+
+def load_items(directory: str, names: list, transform=_item_only):
+    """Same as iter_chunks, flattened into a single iterator of records."""
+    for chunk in iter_chunks(directory, names, transform):
+        yield from chunk
@@ -0,0 +1,450 @@
+"""Single-file append-only storage for a list.
+
+A list directory holding a LOG_FILENAME file keeps its items in that log
+instead of one yaml file per item. Every write appends a frame holding the
+item file name and its exact yaml text, so unpacking the log back into
+yaml files is lossless. An offset index maps each item to its latest frame
+and the log is compacted once most of it is dead frames.
+
+Frame layout (little endian)::
+
+    op (b"P" put, b"D" delete) | name length u32 | data length u32
+    | crc32 u32 of name + data | write time i64 ns | name utf-8 | data utf-8
+
+The helpers at the bottom take item file paths, as open_yaml_file and
+save_to_yaml do, and go to the log or to the plain file as appropriate.
+
+A store is shared by the UI thread, the I/O worker and the export thread,
+so it reads and writes under a lock; compaction replaces the log and its
+offsets together.
+"""
+
+import os
+import json
+import time
+import shutil
+import struct
+import zlib
+import logging
+import threading
+from typing import NamedTuple
+
+from storage import metrics
+from storage.atomic import sync_directory, sync_file
+
+LOG_FILENAME = ".items.log"
+LOG_INDEX_FILENAME = ".items.idx"
+MAGIC = b"LSTLOG1\n"
+HEADER_SIZE = len(MAGIC) + 8
+FRAME = struct.Struct("<cIIIq")
+# Compact once dead frames outweigh live ones and the log is this big.
+COMPACT_MIN_BYTES = 1 << 20
+# The offset index is saved once this many bytes were appended after it;
+# frames past the saved size are scanned on open.
+INDEX_LAG_BYTES = 1 << 16
+
+logger = logging.getLogger(__name__)
+
+
+class ItemStat(NamedTuple):
+    """The stat fields the indexes use, for items stored in a log."""
+
+    st_mtime_ns: int
+    st_size: int
+
+
+class LogStore:
+    """Append-only log of the items of one list directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, LOG_FILENAME)
+        self.index_path = os.path.join(directory, LOG_INDEX_FILENAME)
+        self.generation = b""
+        self.entries = {}  # name -> (data offset, data length, time_ns)
+        self.size = 0
+        self.indexed_size = 0
+        self.dead_bytes = 0
+        self.lock = threading.RLock()
+        self.open()
+
+    # file handling
+    @staticmethod
+    def create(directory: str) -> "LogStore":
+        """Creates an empty log in a directory and returns its store."""
+        path = os.path.join(directory, LOG_FILENAME)
+        with open(path, "xb") as file:
+            file.write(MAGIC + os.urandom(8))
+        return LogStore(directory)
+
+    def open(self) -> None:
+        """Loads the offset index and scans the frames written after it."""
+        with self.lock:
+            self._open()
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        if header[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a list log")
+        self.generation = header[len(MAGIC) :]
+        self.entries = {}
+        self.size = HEADER_SIZE
+        self.dead_bytes = 0
+        try:
+            with open(self.index_path, encoding="utf-8") as file:
+                saved = json.load(file)
+            if saved["generation"] == self.generation.hex() and saved[
+                "size"
+            ] <= os.path.getsize(self.path):
+                self.entries = {k: tuple(v) for k, v in saved["entries"].items()}
+                self.size = saved["size"]
+                self.dead_bytes = saved["dead_bytes"]
+        except (OSError, ValueError, KeyError):
+            pass
+        self.indexed_size = self.size
+        self._scan()
+
+    def _scan(self) -> None:
+        """Indexes the frames after self.size, dropping a torn last frame."""
+        with open(self.path, "rb") as file:
+            file.seek(self.size)
+            while True:
+                head = file.read(FRAME.size)
+                if len(head) < FRAME.size:
+                    break
+                op, name_len, data_len, crc, time_ns = FRAME.unpack(head)
+                body = file.read(name_len + data_len)
+                if len(body) < name_len + data_len or zlib.crc32(body) != crc:
+                    break
+                name = body[:name_len].decode("utf-8")
+                self._apply(op, name, self.size + FRAME.size + name_len, data_len, time_ns)
+                self.size += FRAME.size + name_len + data_len
+        if self.size < os.path.getsize(self.path):
+            logger.warning("Truncating torn frame at the end of %s", self.path)
+            with open(self.path, "r+b") as file:
+                file.truncate(self.size)
+
+    def _apply(self, op, name, offset, length, time_ns) -> None:
+        old = self.entries.pop(name, None)
+        if old is not None:
+            self.dead_bytes += FRAME.size + len(name.encode("utf-8")) + old[1]
+        if op == b"P":
+            self.entries[name] = (offset, length, time_ns)
+        else:
+            self.dead_bytes += FRAME.size + len(name.encode("utf-8"))
+
+    def save_index(self) -> None:
+        """Persists the offset index so the next open skips the scan."""
+        with self.lock:
+            self._save_index()
+
+    def _save_index(self) -> None:
+        data = {
+            "generation": self.generation.hex(),
+            "size": self.size,
+            "dead_bytes": self.dead_bytes,
+            "entries": self.entries,
+        }
+        try:
+            with open(self.index_path, "w", encoding="utf-8") as file:
+                json.dump(data, file, separators=(",", ":"))
+            self.indexed_size = self.size
+        except OSError as e:
+            logger.error("Could not write log index %s: %s", self.index_path, e)
+
+    def _append(self, op: bytes, name: str, data: bytes) -> None:
+        name_bytes = name.encode("utf-8")
+        time_ns = time.time_ns()
+        frame = FRAME.pack(
+            op, len(name_bytes), len(data), zlib.crc32(name_bytes + data), time_ns
+        )
+        with open(self.path, "ab") as file:
+            file.write(frame + name_bytes + data)
+            sync_file(file)
+        offset = self.size + FRAME.size + len(name_bytes)
+        self._apply(op, name, offset, len(data), time_ns)
+        self.size += len(frame) + len(name_bytes) + len(data)
+        if self.dead_bytes > self.size - self.dead_bytes >= 0 and (
+            self.size >= COMPACT_MIN_BYTES
+        ):
+            self._compact()
+        elif self.size - self.indexed_size >= INDEX_LAG_BYTES:
+            self._save_index()
+
+    # item access
+    def names(self) -> list:
+        """Returns the names of the stored items."""
+        with self.lock:
+            return list(self.entries)
+
+    def stat(self, name: str) -> ItemStat:
+        """Returns the write time and size of an item, like os.stat."""
+        try:
+            _, length, time_ns = self.entries[name]
+        except KeyError as e:
+            raise FileNotFoundError(os.path.join(self.directory, name)) from e
+        return ItemStat(time_ns, length)
+
+    def read(self, name: str) -> str:
+        """Returns the yaml text of an item."""
+        # Held until the frame is read, so a compaction cannot move it.
+        with self.lock:
+            try:
+                offset, length, _ = self.entries[name]
+            except KeyError as e:
+                raise FileNotFoundError(os.path.join(self.directory, name)) from e
+            with open(self.path, "rb") as file:
+                file.seek(offset)
+                return file.read(length).decode("utf-8")
+
+    def write(self, name: str, text: str) -> None:
+        """Stores the yaml text of an item."""
+        data = text.encode("utf-8")
+        with self.lock:
+            self._append(b"P", name, data)
+        metrics.count("files_written")
+        metrics.count("bytes_written", len(data))
+
+    def delete(self, name: str) -> None:
+        """Deletes an item."""
+        with self.lock:
+            if name not in self.entries:
+                raise FileNotFoundError(os.path.join(self.directory, name))
+            self._append(b"D", name, b"")
+
+    def compact(self) -> None:
+        """Rewrites the log with only the latest frame of each live item."""
+        with self.lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        generation = os.urandom(8)
+        entries = {}
+        size = HEADER_SIZE
+        with open(self.path, "rb") as source, open(temp_path, "wb") as target:
+            target.write(MAGIC + generation)
+            for name, (offset, length, time_ns) in self.entries.items():
+                source.seek(offset)
+                data = source.read(length)
+                name_bytes = name.encode("utf-8")
+                target.write(
+                    FRAME.pack(
+                        b"P",
+                        len(name_bytes),
+                        length,
+                        zlib.crc32(name_bytes + data),
+                        time_ns,
+                    )
+                    + name_bytes
+                    + data
+                )
+                entries[name] = (size + FRAME.size + len(name_bytes), length, time_ns)
+                size += FRAME.size + len(name_bytes) + length
+            sync_file(target)
+        os.replace(temp_path, self.path)
+        sync_directory(self.directory)
+        self.generation = generation
+        self.entries = entries
+        self.size = size
+        self.dead_bytes = 0
+        self._save_index()
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(directory: str):
+    """
+    Summary:
+    Returns the log store of a list directory.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+
+    Returns:
+    A LogStore, or None if the directory keeps plain yaml files.
+    """
+    key = os.path.normpath(directory)
+    path = os.path.join(directory, LOG_FILENAME)
+    with _STORES_LOCK:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            _STORES.pop(key, None)
+            return None
+        cached = _STORES.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        if cached is not None:
+            # written by someone else (e.g. a sync tool), pick up the new frames
+            store = cached[1]
+            store.open()
+        else:
+            store = LogStore(directory)
+        _STORES[key] = (os.stat(path).st_mtime_ns, store)
+        return store
+
+
+def _remember(store: LogStore) -> None:
+    """Records the log mtime after a write through the store."""
+    with _STORES_LOCK:
+        _STORES[os.path.normpath(store.directory)] = (
+            os.stat(store.path).st_mtime_ns,
+            store,
+        )
+
+
+# item file helpers
+def read_item_text(path: str) -> str:
+    """Returns the yaml text of an item file or log entry."""
+    directory, name = os.path.split(path)
+    store = get_store(directory)
+    if store is not None and name in store.entries:
+        return store.read(name)
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def write_item_text(path: str, text: str) -> bool:
+    """
+    Summary:
+    Stores an item in its directory log, if the directory has one.
+
+    Parameters:
+    - path (str): The item file path.
+    - text (str): The item yaml text.
+
+    Returns:
+    True if the item went to a log, False if the caller should write the
+    plain file.
+    """
+    directory, name = os.path.split(path)
+    store = get_store(directory)
+    if store is None:
+        return False
+    store.write(name, text)
+    _remember(store)
+    return True
+
+
+def stat_item(path: str):
+    """Returns the stat of an item file or log entry."""
+    directory, name = os.path.split(path)
+    store = get_store(directory)
+    if store is not None and name in store.entries:
+        return store.stat(name)
+    return os.stat(path)
+
+
+def item_exists(path: str) -> bool:
+    """Whether an item file or log entry exists."""
+    directory, name = os.path.split(path)
+    store = get_store(directory)
+    return (store is not None and name in store.entries) or os.path.exists(path)
+
+
+def item_names(directory: str) -> list:
+    """Returns the names of the items stored in a directory log."""
+    store = get_store(directory)
+    return store.names() if store is not None else []
+
+
+def delete_item_file(path: str) -> None:
+    """Deletes an item file or log entry."""
+    directory, name = os.path.split(path)
+    store = get_store(directory)
+    if store is not None and name in store.entries:
+        store.delete(name)
+        _remember(store)
+    else:
+        os.remove(path)
+
+
+def move_item_file(source: str, destination_dir: str) -> None:
+    """Moves an item between directories, whichever way each stores it."""
+    directory, name = os.path.split(source)
+    source_store = get_store(directory)
+    destination = os.path.join(destination_dir, name)
+    if source_store is None and get_store(destination_dir) is None:
+        shutil.move(source, destination_dir)
+        return
+    text = read_item_text(source)
+    if not write_item_text(destination, text):
+        with open(destination, "w", encoding="utf-8") as file:
+            file.write(text)
+    delete_item_file(source)
+
+
+def pack_directory(directory: str, names: list) -> LogStore:
+    """
+    Summary:
+    Moves yaml files of a directory into its log, creating the log if needed.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - names (list): The item file names to move.
+
+    Returns:
+    The LogStore.
+    """
+    store = get_store(directory) or LogStore.create(directory)
+    for name in names:
+        path = os.path.join(directory, name)
+        with open(path, encoding="utf-8", newline="") as file:
+            store.write(name, file.read())
+    for name in names:
+        os.remove(os.path.join(directory, name))
+    _remember(store)
+    return store
+
+
+def export_yaml(directory: str, names: list, destination: str) -> int:
+    """
+    Summary:
+    Writes items out as plain yaml files, byte for byte as they are stored
+    and with their original modification times.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+    - names (list): The item file names to write.
+    - destination (str): The folder to write the files to.
+
+    Returns:
+    The number of items written.
+    """
+    os.makedirs(destination, exist_ok=True)
+    for name in names:
+        source = os.path.join(directory, name)
+        target = os.path.join(destination, name)
+        stat = stat_item(source)
+        text = read_item_text(source)
+        with open(target, "w", encoding="utf-8", newline="") as file:
+            file.write(text)
+        os.utime(target, ns=(stat.st_mtime_ns, stat.st_mtime_ns))
+    return len(names)
+
+
+def unpack_directory(directory: str) -> int:
+    """
+    Summary:
+    Turns a directory log back into one yaml file per item and removes it.
+
+    Parameters:
+    - directory (str): A list or archive directory path.
+
+    Returns:
+    The number of items written.
+    """
+    store = get_store(directory)
+    if store is None:
+        return 0
+    count = export_yaml(directory, store.names(), directory)
+    os.remove(store.path)
+    if os.path.exists(store.index_path):
+        os.remove(store.index_path)
+    with _STORES_LOCK:
+        _STORES.pop(os.path.normpath(directory), None)
+    return count
@@ -0,0 +1,187 @@
+"""Hot path instrumentation.
+
+Spans time operations with perf_counter_ns and add the duration to a
+histogram per operation; counters track files read and written, bytes
+parsed and widgets created. Everything is off by default: a disabled span
+is a shared no-op object and a disabled count returns at once, so the calls
+can stay in the hot paths. Enable with enable() or LISTER_METRICS=1 and
+read the results with snapshot() or dump().
+"""
+
+import os
+import json
+import time
+import threading
+from functools import wraps
+
+_enabled = os.environ.get("LISTER_METRICS") == "1"
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """Durations of an operation, in power of two nanosecond buckets."""
+
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = {}  # bit length of the duration -> count
+
+    def add(self, duration_ns: int) -> None:
+        """Records one duration."""
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.min_ns = duration_ns if self.min_ns is None else min(self.min_ns, duration_ns)
+        bucket = duration_ns.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction: float) -> int:
+        """Returns the upper bound of the bucket holding a percentile."""
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(1 << bucket, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> dict:
+        """Returns the summary written by dump()."""
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0,
+            "min_ms": (self.min_ns or 0) / 1e6,
+            "p50_ms": self.percentile(0.5) / 1e6,
+            "p95_ms": self.percentile(0.95) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+
+def enable(enabled: bool = True) -> None:
+    """Turns recording on or off."""
+    global _enabled  # pylint: disable=global-statement
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """Returns whether recording is on."""
+    return _enabled
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds to a counter, e.g. "files_read"."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def record(name: str, duration_ns: int) -> None:
+    """Adds a duration measured elsewhere to an operation histogram."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(duration_ns)
+
+
+class _Span:
+    __slots__ = ("name", "start_ns")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter_ns() - self.start_ns)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str):
+    """
+    Summary:
+    Times a block into the histogram of an operation.
+
+        with metrics.span("list_open"):
+            ...
+
+    Parameters:
+    - name (str): The operation name.
+
+    Returns:
+    A context manager, a shared no-op one while recording is off.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: str = None):
+    """Decorator timing every call of a function, by default under its name."""
+
+    def decorator(func):
+        operation = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start_ns = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(operation, time.perf_counter_ns() - start_ns)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    """Returns the counters and histogram summaries recorded so far."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "operations": {
+                name: histogram.to_dict() for name, histogram in _histograms.items()
+            },
+        }
+
+
+def reset() -> None:
+    """Clears everything recorded so far."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def dump(path: str) -> None:
+    """Writes snapshot() to a JSON file."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(snapshot(), file, indent=2, sort_keys=True)
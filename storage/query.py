@@ -0,0 +1,434 @@
+"""Item filters for the list and table views.
+
+A filter is a small query over the template fields, e.g.::
+
+    checked == False and Due < today and Category in {Home, Work}
+
+Comparisons are ==, !=, <, <=, >, >=, in {..}, not in {..} and contains,
+combined with and, or, not and parentheses. Field names and values with
+spaces are quoted. Values are compared as the table sorts them (see
+storage.sorting): typed by the template field type, text without case, and
+ordering comparisons only match values of the declared type. "" stands for
+a missing value and today (or today-7, today+1) for the current date.
+
+Queries are evaluated against whatever already holds the values: the
+metadata index for queries on checked alone, the compact records of the
+table view, or the SQLite mirror (see Repository.filter_pages). Otherwise
+the items are parsed newest first and parsing stops once a page of
+matches is full.
+"""
+
+import re
+import operator
+from datetime import date, timedelta
+from functools import partial
+
+from storage.index import entry_from_item
+from storage.listing import sorted_item_names
+from storage.loader import load_items
+from storage.records import CHECKED
+from storage.sorting import MISSING, sort_key
+
+TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>"[^"]*"|'[^']*')
+        |(?P<op>==|!=|<=|>=|<|>|=)
+        |(?P<punct>[(){},])
+        |(?P<word>[^\s(){},=!<>"']+)
+    )""",
+    re.VERBOSE,
+)
+TODAY_RE = re.compile(r"today(?:([+-])(\d+))?", re.IGNORECASE)
+TRUE = ("true", "yes", "1")
+FALSE = ("false", "no", "0")
+# Upper bound of the files parsed at once while looking for matches.
+MAX_BATCH_SIZE = 1024
+ORDERING = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+EQUALITY = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda key, keys: key in keys,
+    "not in": lambda key, keys: key not in keys,
+}
+
+
+def tokenize(text: str) -> list:
+    """
+    Summary:
+    Splits a query into (kind, text, position) tokens.
+
+    Parameters:
+    - text (str): The query.
+
+    Returns:
+    A list of tokens, kind being "string", "op", "punct" or "word".
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if match is None:
+            character = text[position:].strip()[:1]
+            raise ValueError(f"Unexpected {character!r} at {position}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1]
+        tokens.append((kind, value, match.start(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser building the query tree."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self, offset: int = 0):
+        """Returns a token ahead without taking it, (None, None, -1) at the end."""
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None, -1)
+
+    def keyword(self, word: str, offset: int = 0) -> bool:
+        """Whether a token ahead is the given keyword, in any case."""
+        kind, value, _ = self.peek(offset)
+        return kind == "word" and value.lower() == word
+
+    def take(self):
+        """Returns the next token and moves past it."""
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("Unexpected end of filter")
+        self.position += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        """Moves past the given punctuation, raising ValueError if missing."""
+        kind, value, position = self.take()
+        if kind != "punct" or value != text:
+            raise ValueError(f"Expected {text!r} at {position}, found {value!r}")
+
+    def parse(self):
+        """Returns the tree of the whole query."""
+        if not self.tokens:
+            raise ValueError("The filter is empty")
+        node = self.parse_or()
+        kind, value, position = self.peek()
+        if kind is not None:
+            raise ValueError(f"Unexpected {value!r} at {position}")
+        return node
+
+    def parse_or(self):
+        """Parses terms joined by "or"."""
+        children = [self.parse_and()]
+        while self.keyword("or"):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", tuple(children))
+
+    def parse_and(self):
+        """Parses terms joined by "and"."""
+        children = [self.parse_not()]
+        while self.keyword("and"):
+            self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", tuple(children))
+
+    def parse_not(self):
+        """Parses a negation, a parenthesized query or a comparison."""
+        if self.keyword("not"):
+            self.take()
+            return ("not", self.parse_not())
+        if self.peek()[:2] == ("punct", "("):
+            self.take()
+            node = self.parse_or()
+            self.expect(")")
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        """Parses a field, an operator and a value or a set of values."""
+        kind, field, position = self.take()
+        if kind not in ("word", "string"):
+            raise ValueError(f"Expected a field name at {position}, found {field!r}")
+        kind, op, position = self.take()
+        if kind == "op":
+            op = "==" if op == "=" else op
+        elif kind == "word" and op.lower() in ("in", "contains"):
+            op = op.lower()
+        elif kind == "word" and op.lower() == "not" and self.keyword("in"):
+            self.take()
+            op = "not in"
+        else:
+            raise ValueError(f"Expected an operator after {field!r} at {position}")
+        if op in ("in", "not in"):
+            operand = self.parse_set()
+        else:
+            operand = self.parse_value()
+        return ("cmp", field, op, operand)
+
+    def parse_set(self) -> tuple:
+        """Parses a {..} set of values."""
+        self.expect("{")
+        values = []
+        while self.peek()[:2] != ("punct", "}"):
+            values.append(self.parse_value())
+            if self.peek()[:2] == ("punct", ","):
+                self.take()
+        self.take()
+        return tuple(values)
+
+    def parse_value(self):
+        """Parses a value, today (with an offset) as a date."""
+        kind, value, position = self.take()
+        if kind == "word":
+            today = TODAY_RE.fullmatch(value)
+            if today:
+                days = int(today.group(2) or 0)
+                if today.group(1) == "-":
+                    days = -days
+                return date.today() + timedelta(days=days)
+        elif kind != "string":
+            raise ValueError(f"Expected a value at {position}, found {value!r}")
+        return value
+
+
+def _checked_literal(value) -> bool:
+    """Returns a checked value of a query as a bool."""
+    text = str(value).lower()
+    if text in TRUE:
+        return True
+    if text in FALSE:
+        return False
+    raise ValueError(f"checked compares with True or False, not {value!r}")
+
+
+class Query:
+    """A parsed filter, bound to the field types of a list template."""
+
+    def __init__(self, text: str, fields: dict):
+        """
+        Parameters:
+        - text (str): The filter, see the module docstring.
+        - fields (dict): Field name to (field type, categories) pairs.
+
+        Raises ValueError if the filter cannot be parsed.
+        """
+        self.text = text
+        self.field_types = fields
+        self.fields = set()
+        self.root = self._bind(_Parser(text).parse())
+        self.fields = frozenset(self.fields)
+
+    def _key(self, field: str, value) -> tuple:
+        """Returns the normalized key of a value, see storage.sorting."""
+        if field == CHECKED:
+            # Items without the flag are unchecked, as in the list index.
+            return sort_key(bool(value), "Text")
+        field_type, categories = self.field_types.get(field, ("Text", ()))
+        return sort_key(value, field_type, categories)
+
+    def _bind(self, node):
+        """Normalizes the literals with the field types, once."""
+        if node[0] == "not":
+            return ("not", self._bind(node[1]))
+        if node[0] != "cmp":
+            return (node[0], tuple(self._bind(child) for child in node[1]))
+        _, field, op, operand = node
+        self.fields.add(field)
+        if op == "contains":
+            return ("cmp", field, op, str(operand).casefold())
+        if field == CHECKED:
+            operand = (
+                tuple(map(_checked_literal, operand))
+                if op in ("in", "not in")
+                else _checked_literal(operand)
+            )
+        if op in ("in", "not in"):
+            return ("cmp", field, op, frozenset(self._key(field, v) for v in operand))
+        return ("cmp", field, op, self._key(field, operand))
+
+    def __repr__(self) -> str:
+        return f"Query({self.text!r})"
+
+    @property
+    def index_only(self) -> bool:
+        """Whether the list metadata index holds every value the query reads."""
+        return self.fields <= {CHECKED}
+
+    def matches(self, value_of) -> bool:
+        """
+        Summary:
+        Evaluates the query on one item.
+
+        Parameters:
+        - value_of (fn): Returns the raw value of a field, None if missing.
+
+        Returns:
+        Whether the item matches.
+        """
+        return self._evaluate(self.root, value_of)
+
+    def matches_item(self, item) -> bool:
+        """Evaluates the query on a parsed item."""
+        if not isinstance(item, dict):
+            return self.matches(lambda _field: None)
+        return self.matches(item.get)
+
+    def _evaluate(self, node, value_of) -> bool:
+        """Evaluates a node of the query tree."""
+        kind = node[0]
+        if kind == "and":
+            return all(self._evaluate(child, value_of) for child in node[1])
+        if kind == "or":
+            return any(self._evaluate(child, value_of) for child in node[1])
+        if kind == "not":
+            return not self._evaluate(node[1], value_of)
+        _, field, op, operand = node
+        return self._compare(field, op, operand, value_of(field))
+
+    def _compare(self, field: str, op: str, operand, value) -> bool:
+        """Evaluates a comparison on the raw value of a field."""
+        if op == "contains":
+            return value is not None and operand in str(value).casefold()
+        key = self._key(field, value)
+        if op in ORDERING:
+            # Ordering only compares values of the same kind, never missing ones.
+            if key[0] != operand[0] or key[0] == MISSING:
+                return False
+            return ORDERING[op](key[1], operand[1])
+        return EQUALITY[op](key, operand)
+
+    def to_sql(self):
+        """
+        Summary:
+        Translates the query to a condition on the SQLite mirror tables,
+        see storage.repository.SCHEMA.
+
+        Returns:
+        A (where clause, parameters) tuple, or None if the query uses an
+        operator the mirror cannot answer (contains).
+        """
+        params = []
+        try:
+            return self._sql(self.root, params), params
+        except NotImplementedError:
+            return None
+
+    def _sql(self, node, params: list) -> str:
+        """Translates a node of the query tree, adding its parameters."""
+        kind = node[0]
+        if kind in ("and", "or"):
+            return "(" + f" {kind.upper()} ".join(
+                self._sql(child, params) for child in node[1]
+            ) + ")"
+        if kind == "not":
+            return f"NOT {self._sql(node[1], params)}"
+        _, field, op, operand = node
+        if op == "contains":
+            raise NotImplementedError(op)
+        if op in ("in", "not in"):
+            equals = [self._sql_equals(field, key, params) for key in operand]
+            condition = "(" + " OR ".join(equals or ["0"]) + ")"
+        elif op in ("==", "!="):
+            condition = self._sql_equals(field, operand, params)
+        else:
+            return self._sql_ordering(field, op, operand, params)
+        return condition if op in ("in", "==") else f"NOT {condition}"
+
+    @staticmethod
+    def _sql_ordering(field: str, op: str, operand: tuple, params: list) -> str:
+        """Translates an ordering comparison, see _compare."""
+        group, key = operand
+        if field == CHECKED:
+            params.append(key)
+            return f"items.checked {op} ?"
+        if group == MISSING:
+            return "0"
+        params.extend((field, group, key))
+        return f"EXISTS ({_VALUE_SQL} AND v.key_group = ? AND v.key_value {op} ?)"
+
+    @staticmethod
+    def _sql_equals(field: str, operand: tuple, params: list) -> str:
+        """Translates an equality with a normalized value."""
+        group, key = operand
+        if field == CHECKED:
+            params.append(key)
+            return "items.checked = ?"
+        if group == MISSING:
+            # Missing values have no item_values row.
+            params.append(field)
+            return f"NOT EXISTS ({_VALUE_SQL})"
+        params.extend((field, group, key))
+        return f"EXISTS ({_VALUE_SQL} AND v.key_group = ? AND v.key_value = ?)"
+
+
+_VALUE_SQL = (
+    "SELECT 1 FROM item_values v WHERE v.directory = items.directory"
+    " AND v.name = items.name AND v.field = ?"
+)
+
+
+def _match(query: Query, item, stat) -> tuple:
+    """Load transform giving the entry of an item and whether it matches."""
+    return entry_from_item(item, stat), query.matches_item(item)
+
+
+def _paged(matches, page_size: int):
+    """Groups (file name, entry) pairs into dicts of page_size entries."""
+    page = {}
+    for name, entry in matches:
+        page[name] = entry
+        if len(page) >= page_size:
+            yield page
+            page = {}
+    if page:
+        yield page
+
+
+def _indexed_matches(index, query: Query, page_size: int):
+    """Yields the matching (file name, entry) pairs, from the index alone."""
+    for page in index.entry_pages(page_size):
+        for name, entry in page.items():
+            if query.matches({CHECKED: entry.checked}.get):
+                yield name, entry
+
+
+def _parsed_matches(directory: str, query: Query, page_size: int):
+    """Yields the matching (file name, entry) pairs, parsing the items."""
+    names = sorted_item_names(directory)
+    transform = partial(_match, query)
+    start = 0
+    batch = page_size
+    while start < len(names):
+        chunk = names[start : start + batch]
+        for name, record in load_items(directory, chunk, transform):
+            if record is not None and record[1]:
+                yield name, record[0]
+        start += batch
+        # Selective filters fill pages slowly, so parse more at a time.
+        batch = min(batch * 2, MAX_BATCH_SIZE)
+
+
+def matching_pages(index, query: Query, page_size: int):
+    """
+    Summary:
+    Yields the entries of the items of a list matching a query, newest
+    first, a page at a time. Items are only read as pages are asked for.
+
+    Parameters:
+    - index (ListIndex): The index of the list (or archive) directory.
+    - query (Query): The filter.
+    - page_size (int): The number of matches per page.
+
+    Returns:
+    A generator of dicts of file names to IndexEntry, in order.
+    """
+    if query.index_only:
+        matches = _indexed_matches(index, query, page_size)
+    else:
+        matches = _parsed_matches(index.directory, query, page_size)
+    return _paged(matches, page_size)
@@ -0,0 +1,335 @@
+"""Compact in-memory item records for the list and table views.
+
+A parsed item is a dict of a few hundred bytes, and the views used to keep
+one per item plus another dict per row. Instead:
+
+- ItemRow is a slotted list view row. It reads like the row dicts that
+  RecycleView expects, builds the item path only when asked and shares
+  the directory string between rows.
+- RecordTable keeps the items of a list in one array per column, following
+  the template schema. Category values are stored as small codes into an
+  interned value table and the checked flags as bitmaps.
+"""
+
+import os
+import sys
+from array import array
+
+CHECKED = "checked"
+
+
+class ItemRow:
+    """A list view row with "text", "yaml_path" and "checked" keys."""
+
+    __slots__ = ("directory", "name", "text", "checked")
+    KEYS = ("text", "yaml_path", "checked")
+
+    def __init__(self, directory: str, name: str, text: str, checked: bool):
+        self.directory = directory
+        self.name = name
+        self.text = text
+        self.checked = checked
+
+    @property
+    def yaml_path(self) -> str:
+        """The item file path."""
+        return os.path.join(self.directory, self.name)
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == "yaml_path":
+            self.directory, self.name = os.path.split(value)
+        elif key in self.KEYS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return f"ItemRow({dict(self.items())!r})"
+
+    def get(self, key: str, default=None):
+        """Returns a value, or default for keys a row does not have."""
+        return getattr(self, key) if key in self.KEYS else default
+
+    def keys(self) -> tuple:
+        """Returns the row keys."""
+        return self.KEYS
+
+    def items(self) -> list:
+        """Returns the (key, value) pairs, as RecycleView reads them."""
+        return [(key, getattr(self, key)) for key in self.KEYS]
+
+    def update(self, values=(), **kwargs) -> None:
+        """Sets several values, like dict.update."""
+        for key, value in dict(values, **kwargs).items():
+            self[key] = value
+
+
+# Marks a cell whose item does not have the field.
+ABSENT = type("Absent", (), {"__repr__": lambda self: "ABSENT"})()
+
+
+class ValueColumn:
+    """A column of arbitrary values."""
+
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = []
+
+    def append(self, value) -> None:
+        """Adds a cell at the end."""
+        self.values.append(value)
+
+    def get(self, row: int):
+        """Returns a cell, ABSENT if the item lacks the field."""
+        return self.values[row]
+
+    def set(self, row: int, value) -> None:
+        """Replaces a cell."""
+        self.values[row] = value
+
+    def move_last(self, row: int) -> None:
+        """Moves the last cell over row and drops the last position."""
+        self.values[row] = self.values[-1]
+        self.values.pop()
+
+
+class CategoryColumn:
+    """A column of repeated values, stored as codes into a value table."""
+
+    __slots__ = ("codes", "table", "lookup", "others")
+
+    # Code 0 is a missing cell and code 1 a value kept in others, e.g. a
+    # list. Interned values start at 2.
+    OTHER = 1
+
+    def __init__(self, categories=()):
+        self.codes = array("H")
+        self.table = [ABSENT, ABSENT]
+        self.lookup = {}
+        self.others = {}  # row -> value
+        for category in categories:
+            self._code(category)
+
+    def _code(self, value) -> int:
+        if value is ABSENT:
+            return 0
+        try:
+            code = self.lookup.get(value)
+        except TypeError:  # unhashable
+            return self.OTHER
+        if code is None:
+            if len(self.table) > 0xFFFF:
+                return self.OTHER
+            code = len(self.table)
+            self.table.append(sys.intern(value) if isinstance(value, str) else value)
+            self.lookup[value] = code
+        return code
+
+    def append(self, value) -> None:
+        """Adds a cell at the end."""
+        self.codes.append(0)
+        self.set(len(self.codes) - 1, value)
+
+    def get(self, row: int):
+        """Returns a cell, ABSENT if the item lacks the field."""
+        code = self.codes[row]
+        return self.others[row] if code == self.OTHER else self.table[code]
+
+    def set(self, row: int, value) -> None:
+        """Replaces a cell."""
+        code = self._code(value)
+        self.codes[row] = code
+        if code == self.OTHER:
+            self.others[row] = value
+        else:
+            self.others.pop(row, None)
+
+    def move_last(self, row: int) -> None:
+        """Moves the last cell over row and drops the last position."""
+        last = len(self.codes) - 1
+        self.set(row, self.get(last))
+        self.others.pop(last, None)
+        self.codes.pop()
+
+
+class FlagColumn:
+    """A column of booleans, stored as two bitmaps: present and value."""
+
+    __slots__ = ("present", "flags", "size", "others")
+
+    def __init__(self):
+        self.present = bytearray()
+        self.flags = bytearray()
+        self.size = 0
+        self.others = {}  # row -> value that is not a bool
+
+    def append(self, value) -> None:
+        """Adds a cell at the end."""
+        if self.size % 8 == 0:
+            self.present.append(0)
+            self.flags.append(0)
+        self.size += 1
+        self.set(self.size - 1, value)
+
+    def get(self, row: int):
+        """Returns a cell, ABSENT if the item lacks the field."""
+        if row in self.others:
+            return self.others[row]
+        byte, bit = divmod(row, 8)
+        if not self.present[byte] >> bit & 1:
+            return ABSENT
+        return bool(self.flags[byte] >> bit & 1)
+
+    def set(self, row: int, value) -> None:
+        """Replaces a cell."""
+        byte, bit = divmod(row, 8)
+        mask = 1 << bit
+        self.others.pop(row, None)
+        self.present[byte] &= ~mask & 0xFF
+        self.flags[byte] &= ~mask & 0xFF
+        if isinstance(value, bool):
+            self.present[byte] |= mask
+            if value:
+                self.flags[byte] |= mask
+        elif value is not ABSENT:
+            self.others[row] = value
+
+    def move_last(self, row: int) -> None:
+        """Moves the last cell over row and drops the last position."""
+        last = self.size - 1
+        self.set(row, self.get(last))
+        self.set(last, ABSENT)
+        self.size -= 1
+        if self.size % 8 == 0:
+            self.present.pop()
+            self.flags.pop()
+
+
+class RecordTable:
+    """The items of a list, stored column by column."""
+
+    def __init__(self, fields: dict, hidden=frozenset()):
+        """
+        Parameters:
+        - fields (dict): Field name to (field type, categories) pairs, in
+          template order. Keys found in items but not in the template get
+          a column of their own after the template fields.
+        - hidden (frozenset): Fields not to store at all.
+        """
+        self.fields = fields
+        self.hidden = hidden
+        self.names = []  # row -> file name
+        self.rows = {}  # file name -> row
+        # row -> mtime_ns and size of the parsed file, -1 if not known
+        self.mtimes = array("q")
+        self.sizes = array("q")
+        self.columns = {}
+        for field, (field_type, categories) in fields.items():
+            if field not in hidden:
+                self._add_column(field, field_type, categories)
+
+    def _add_column(self, field: str, field_type: str = "Text", categories=()):
+        if field == CHECKED:
+            column = FlagColumn()
+        elif field_type == "Category":
+            column = CategoryColumn(categories)
+        else:
+            column = ValueColumn()
+        for _ in self.names:
+            column.append(ABSENT)
+        self.columns[field] = column
+        return column
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, row: int) -> dict:
+        return self.row(row)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.rows
+
+    def stamp(self, name: str):
+        """Returns the (mtime_ns, size) an item was stored with, or None."""
+        row = self.rows.get(name)
+        if row is None or self.sizes[row] < 0:
+            return None
+        return (self.mtimes[row], self.sizes[row])
+
+    def set(self, name: str, item: dict, stamp=None) -> None:
+        """
+        Summary:
+        Stores a parsed item, replacing an older version of it.
+
+        Parameters:
+        - name (str): The item file name.
+        - item (dict): The parsed item.
+        - stamp (tuple): The (mtime_ns, size) of the parsed file.
+
+        Returns:
+        None
+        """
+        for field in item:
+            if field not in self.columns and field not in self.hidden:
+                self._add_column(field)
+        mtime_ns, size = stamp or (-1, -1)
+        row = self.rows.get(name)
+        if row is None:
+            self.rows[name] = len(self.names)
+            self.names.append(name)
+            self.mtimes.append(mtime_ns)
+            self.sizes.append(size)
+            for field, column in self.columns.items():
+                column.append(item.get(field, ABSENT))
+        else:
+            self.mtimes[row] = mtime_ns
+            self.sizes[row] = size
+            for field, column in self.columns.items():
+                column.set(row, item.get(field, ABSENT))
+
+    def remove(self, name: str) -> None:
+        """Drops an item, moving the last row into its place."""
+        row = self.rows.pop(name)
+        last_name = self.names.pop()
+        last_mtime_ns = self.mtimes.pop()
+        last_size = self.sizes.pop()
+        for column in self.columns.values():
+            column.move_last(row)
+        if row < len(self.names):
+            self.names[row] = last_name
+            self.mtimes[row] = last_mtime_ns
+            self.sizes[row] = last_size
+            self.rows[last_name] = row
+
+    def value(self, row: int, field: str, default=None):
+        """Returns a cell, or default if the item lacks the field."""
+        column = self.columns.get(field)
+        value = ABSENT if column is None else column.get(row)
+        return default if value is ABSENT else value
+
+    def column(self, field: str, default=None) -> list:
+        """Returns the cells of a column, default for missing ones."""
+        return [self.value(row, field, default) for row in range(len(self.names))]
+
+    def row(self, row: int) -> dict:
+        """Returns an item as a dict, with its fields in column order."""
+        return {
+            field: value
+            for field, column in self.columns.items()
+            if (value := column.get(row)) is not ABSENT
+        }
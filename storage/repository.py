@@ -0,0 +1,542 @@
+"""Repository API for lists, items, templates and archives.
+
+Screens and components go through a Repository instead of touching the
+folders directly. Repository keeps everything as yaml files (or list logs,
+see storage.log_store) and answers queries from the per-list indexes.
+SQLiteRepository additionally mirrors item metadata and field values into
+a local database, so filters run in SQL. Listing and sorting still go through
+the list index and the table model. The yaml files stay the source of truth and
+the database can be rebuilt from them at any time.
+"""
+
+import os
+import shutil
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from functools import partial
+
+from storage import metrics
+from storage.atomic import atomic_write
+from storage.codec import dump_yaml, load_yaml
+from storage.index import (
+    IndexEntry,
+    add_listener,
+    forget_directory,
+    get_index,
+    index_item,
+    move_items,
+    rename_directory,
+    unindex_item,
+)
+from storage.listing import list_item_files, newest_first
+from storage.loader import load_items
+from storage.log_store import (
+    delete_item_file,
+    get_store,
+    item_exists,
+    move_item_file,
+    read_item_text,
+    write_item_text,
+)
+from storage.query import Query, matching_pages
+from storage.sorting import MISSING, sort_key
+from storage.templates import (
+    TEMPLATES,
+    Template,
+    read_template,
+    read_template_fields,
+)
+
+BACKENDS = ("files", "sqlite")
+# Bumped when sort keys change, so mirrors keyed the old way are rebuilt.
+# 2: categories match without case or surrounding spaces.
+KEY_VERSION = 2
+
+logger = logging.getLogger(__name__)
+
+
+def read_yaml(path: str):
+    """Reads an item (or any yaml file), wherever its list keeps it."""
+    text = read_item_text(path)
+    metrics.count("files_read")
+    metrics.count("bytes_parsed", len(text))
+    return load_yaml(text)
+
+
+def write_yaml(path: str, data) -> None:
+    """
+    Summary:
+    Writes an item (or any yaml file) and records it in the list index.
+    Files are replaced atomically, so a crash never leaves them truncated.
+
+    Parameters:
+    - path (str): A file path.
+    - data (dict): The yaml content.
+
+    Returns:
+    None
+    """
+    text = dump_yaml(data)
+    if not write_item_text(path, text):
+        atomic_write(path, text)
+    index_item(path, data)
+
+
+def template_field_types(template_path: str) -> dict:
+    """Returns field name to (field type, categories) pairs of a template."""
+    return {
+        field.name: (field.type, field.categories)
+        for field in read_template_fields(template_path)
+    }
+
+
+class Repository:
+    """Lists, items, templates and archives kept as yaml files."""
+
+    def __init__(self, lists_path: str, archives_path: str, templates_path: str):
+        self.lists_path = lists_path
+        self.archives_path = archives_path
+        self.templates_path = templates_path
+
+    # paths
+    def list_dir(self, list_name: str, archived: bool = False) -> str:
+        """Returns the folder of a list, or of its archive."""
+        root = self.archives_path if archived else self.lists_path
+        return os.path.join(root, list_name)
+
+    def template_path(self, list_name: str) -> str:
+        """Returns the template file of a list."""
+        return os.path.join(self.templates_path, f"{list_name}.yaml")
+
+    def new_item_path(self, list_name: str) -> str:
+        """Returns the file path of a new item, named after the list and time."""
+        new_date = datetime.now().strftime("%Y-%m-%d %H%M%S")
+        return os.path.join(self.list_dir(list_name), f"{list_name}_{new_date}.yaml")
+
+    # lists
+    def lists_mtime_ns(self) -> int:
+        """Returns the lists folder mtime, which changes when lists do."""
+        return os.stat(self.lists_path).st_mtime_ns
+
+    def list_names(self) -> list:
+        """Returns the names of all lists."""
+        return [name for name in os.listdir(self.lists_path) if not name.startswith(".")]
+
+    def create_list(self, list_name: str, template: dict) -> None:
+        """Writes the template of a new list and creates its folder."""
+        self.write_template(list_name, template)
+        os.makedirs(self.list_dir(list_name), exist_ok=True)
+
+    def delete_list(self, list_name: str) -> None:
+        """Deletes a list, its archive and its template."""
+        list_dir = self.list_dir(list_name)
+        archive_dir = self.list_dir(list_name, archived=True)
+        if os.path.exists(archive_dir):
+            shutil.rmtree(archive_dir)
+        shutil.rmtree(list_dir)
+        os.remove(self.template_path(list_name))
+        TEMPLATES.invalidate(self.template_path(list_name))
+        forget_directory(list_dir)
+        forget_directory(archive_dir)
+
+    def rename_list(self, old_name: str, new_name: str) -> None:
+        """
+        Summary:
+        Renames a list together with its archive and template.
+
+        Parameters:
+        - old_name (str): The current list name.
+        - new_name (str): The new list name.
+
+        Returns:
+        None
+        """
+        template = self.read_template(old_name).to_dict()
+        template[new_name] = template.pop(old_name)
+        self.write_template(new_name, template)
+        os.remove(self.template_path(old_name))
+        TEMPLATES.invalidate(self.template_path(old_name))
+
+        for archived in (False, True):
+            old_dir = self.list_dir(old_name, archived)
+            new_dir = self.list_dir(new_name, archived)
+            if os.path.exists(old_dir):
+                os.rename(old_dir, new_dir)
+                rename_directory(old_dir, new_dir)
+
+    # templates
+    def read_template(self, list_name: str) -> Template:
+        """Returns the parsed template of a list, from the template cache."""
+        return read_template(self.template_path(list_name))
+
+    def write_template(self, list_name: str, template: dict) -> None:
+        """Writes the template of a list and updates the template cache."""
+        path = self.template_path(list_name)
+        write_yaml(path, template)
+        TEMPLATES.update(path, template)
+
+    # items
+    def item_names(self, list_name: str, archived: bool = False) -> list:
+        """Returns the item file names of a list."""
+        return list_item_files(self.list_dir(list_name, archived))
+
+    def entries(self, list_name: str, archived: bool = False) -> dict:
+        """Returns the file name to IndexEntry metadata of a list's items."""
+        return get_index(self.list_dir(list_name, archived)).entries()
+
+    def entry_pages(self, list_name: str, page_size: int, archived: bool = False):
+        """
+        Summary:
+        Yields the IndexEntry metadata of a list's items newest first, a
+        page at a time, parsing the files of a page only when it is asked
+        for.
+
+        Parameters:
+        - list_name (str): The list name.
+        - page_size (int): The number of files parsed per page.
+        - archived (bool): Whether to read the list's archive.
+
+        Returns:
+        A generator of dicts of file names to IndexEntry, in order.
+        """
+        return get_index(self.list_dir(list_name, archived)).entry_pages(page_size)
+
+    def filter_pages(
+        self,
+        list_name: str,
+        query: Query,
+        page_size: int,
+        archived: bool = False,
+    ):
+        """
+        Summary:
+        Yields the IndexEntry metadata of the items of a list matching a
+        filter, newest first, a page at a time. Items are parsed only as
+        pages are asked for, unless the list index answers the filter.
+
+        Parameters:
+        - list_name (str): The list name.
+        - query (Query): The filter, bound to the list template.
+        - page_size (int): The number of matches per page.
+        - archived (bool): Whether to filter the list's archive.
+
+        Returns:
+        A generator of dicts of file names to IndexEntry, in order.
+        """
+        return matching_pages(
+            get_index(self.list_dir(list_name, archived)), query, page_size
+        )
+
+    def read_item(self, path: str) -> dict:
+        """Returns a parsed item."""
+        return read_yaml(path)
+
+    def write_item(self, path: str, item: dict) -> None:
+        """Writes an item."""
+        with metrics.span("save"):
+            write_yaml(path, item)
+
+    def set_checked(self, path: str, checked: bool) -> None:
+        """Sets the checked flag of an item."""
+        item = self.read_item(path)
+        item["checked"] = checked
+        self.write_item(path, item)
+
+    def item_exists(self, path: str) -> bool:
+        """Whether an item exists."""
+        return item_exists(path)
+
+    def delete_item(self, path: str) -> None:
+        """Deletes an item."""
+        delete_item_file(path)
+        unindex_item(path)
+
+    def archive_items(self, paths: list, list_name: str, unarchive=False) -> tuple:
+        """
+        Summary:
+        Moves a batch of items of a list to its archive, or back. Paths
+        outside the folder the items are moved from fail and stay put.
+
+        Parameters:
+        - paths (list): The item file paths.
+        - list_name (str): The list name.
+        - unarchive (bool): Whether to move the items back to the list.
+
+        Returns:
+        A (moved paths, failed (path, error) pairs) tuple.
+        """
+        with metrics.span("archive"):
+            return self._archive_items(paths, list_name, unarchive)
+
+    def _archive_items(self, paths: list, list_name: str, unarchive: bool) -> tuple:
+        destination = self.list_dir(list_name, archived=not unarchive)
+        source = self.list_dir(list_name, archived=unarchive)
+        os.makedirs(destination, exist_ok=True)
+        # Plain files on the same filesystem only need a rename each.
+        rename = (
+            get_store(source) is None
+            and get_store(destination) is None
+            and os.stat(source).st_dev == os.stat(destination).st_dev
+        )
+        moved = []
+        failed = []
+        for path in paths:
+            if os.path.dirname(os.path.abspath(path)) != os.path.abspath(source):
+                failed.append((path, ValueError(f"{path} is not in {source}")))
+                continue
+            try:
+                if rename:
+                    os.rename(path, os.path.join(destination, os.path.basename(path)))
+                else:
+                    move_item_file(path, destination)
+                moved.append(path)
+            except OSError as e:
+                failed.append((path, e))
+        move_items(moved, destination)
+        return moved, failed
+
+
+def _item_values(field_types: dict, item, stat) -> tuple:
+    """Load transform giving the database rows of an item. Runs in workers."""
+    if not isinstance(item, dict):
+        return None
+    headline = str(next(iter(item.values()))) if item else ""
+    values = []
+    for field, value in item.items():
+        if field == "checked":
+            continue
+        field_type, categories = field_types.get(field, ("Text", ()))
+        group, key = sort_key(value, field_type, categories)
+        if group != MISSING:
+            values.append((field, group, key))
+    checked = bool(item.get("checked", False))
+    return IndexEntry(headline, checked, stat.st_mtime_ns, stat.st_size), values
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    directory TEXT PRIMARY KEY,
+    template_mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS items (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    headline TEXT NOT NULL,
+    checked INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (directory, name)
+);
+CREATE TABLE IF NOT EXISTS item_values (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    field TEXT NOT NULL,
+    key_group INTEGER NOT NULL,
+    key_value,
+    PRIMARY KEY (directory, name, field)
+);
+CREATE INDEX IF NOT EXISTS item_values_sort
+    ON item_values (directory, field, key_group, key_value);
+"""
+
+
+class SQLiteRepository(Repository):
+    """Repository answering item filters from a SQLite mirror of the lists."""
+
+    def __init__(self, lists_path, archives_path, templates_path, db_path: str):
+        super().__init__(lists_path, archives_path, templates_path)
+        self.db_path = db_path
+        # The export and loading threads may query too.
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.synced = {}  # directory -> list index dir_mtime_ns at last sync
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != KEY_VERSION:
+            self._rebuild()
+            self.db.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        add_listener(self.on_change)
+
+    def _key(self, directory: str) -> str:
+        return os.path.normpath(directory)
+
+    def _sync(self, list_name: str, archived: bool = False) -> str:
+        """
+        Summary:
+        Brings the mirror of a list up to date with its files, parsing only
+        the items changed since the last sync.
+
+        Parameters:
+        - list_name (str): The list name.
+        - archived (bool): Whether to sync the archive instead.
+
+        Returns:
+        The database key of the list folder.
+        """
+        directory = self.list_dir(list_name, archived)
+        key = self._key(directory)
+        index = get_index(directory)
+        entries = index.entries()
+        try:
+            template_mtime_ns = os.stat(self.template_path(list_name)).st_mtime_ns
+        except OSError:
+            template_mtime_ns = None
+        if self.synced.get(key) == (index.dir_mtime_ns, template_mtime_ns):
+            return key
+
+        with self.lock, self.db:
+            row = self.db.execute(
+                "SELECT template_mtime_ns FROM directories WHERE directory = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[0] != template_mtime_ns:
+                # Sort keys depend on the field types, so re-key everything.
+                self.db.execute("DELETE FROM items WHERE directory = ?", (key,))
+                self.db.execute("DELETE FROM item_values WHERE directory = ?", (key,))
+                self.db.execute(
+                    "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                    (key, template_mtime_ns),
+                )
+            mirrored = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in self.db.execute(
+                    "SELECT name, mtime_ns, size FROM items WHERE directory = ?",
+                    (key,),
+                )
+            }
+            removed = [(key, name) for name in mirrored.keys() - entries.keys()]
+            self.db.executemany(
+                "DELETE FROM items WHERE directory = ? AND name = ?", removed
+            )
+            self.db.executemany(
+                "DELETE FROM item_values WHERE directory = ? AND name = ?", removed
+            )
+            stale = [
+                name
+                for name, entry in entries.items()
+                if mirrored.get(name) != (entry.mtime_ns, entry.size)
+            ]
+            transform = partial(
+                _item_values, template_field_types(self.template_path(list_name))
+            )
+            for name, record in load_items(directory, stale, transform):
+                if record is not None:
+                    self._store(key, name, *record)
+        self.synced[key] = (index.dir_mtime_ns, template_mtime_ns)
+        return key
+
+    def _store(self, key: str, name: str, entry: IndexEntry, values: list) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?)",
+            (key, name, entry.headline, int(entry.checked), entry.mtime_ns, entry.size),
+        )
+        self.db.execute(
+            "DELETE FROM item_values WHERE directory = ? AND name = ?", (key, name)
+        )
+        self.db.executemany(
+            "INSERT INTO item_values VALUES (?, ?, ?, ?, ?)",
+            [(key, name, field, group, value) for field, group, value in values],
+        )
+
+    def _rebuild(self) -> None:
+        """Drops the mirror, to be rebuilt from the files as lists are used."""
+        with self.lock, self.db:
+            for table in ("directories", "items", "item_values"):
+                self.db.execute(f"DELETE FROM {table}")
+        self.synced = {}
+
+    def on_change(self, event: str, path: str, data=None) -> None:
+        """Drops the sync state of folders changed through the repository."""
+        if event == "move":
+            self._move(data, path)
+            for source in data:
+                self.synced.pop(self._key(os.path.dirname(source)), None)
+            self.synced.pop(self._key(path), None)
+            return
+        self.synced.pop(self._key(os.path.dirname(path)), None)
+        if event in ("rename", "forget"):
+            self.synced.pop(self._key(path), None)
+            with self.lock, self.db:
+                for table in ("directories", "items", "item_values"):
+                    self.db.execute(
+                        f"DELETE FROM {table} WHERE directory = ?",
+                        (self._key(path),),
+                    )
+
+    def _move(self, sources: list, destination: str) -> None:
+        """Moves the rows of a batch of moved items, in one transaction."""
+        key = self._key(destination)
+        moved = [
+            (key, self._key(os.path.dirname(source)), os.path.basename(source))
+            for source in sources
+        ]
+        with self.lock, self.db:
+            mirrored = self.db.execute(
+                "SELECT 1 FROM directories WHERE directory = ?", (key,)
+            ).fetchone()
+            for table in ("items", "item_values"):
+                if mirrored:
+                    self.db.executemany(
+                        f"UPDATE OR REPLACE {table} SET directory = ?"
+                        " WHERE directory = ? AND name = ?",
+                        moved,
+                    )
+                else:
+                    # The destination is keyed on its first sync.
+                    self.db.executemany(
+                        f"DELETE FROM {table} WHERE directory = ? AND name = ?",
+                        [row[1:] for row in moved],
+                    )
+
+    # queries
+    def filter_pages(self, list_name, query, page_size, archived=False):
+        sql = query.to_sql()
+        if sql is None:
+            yield from super().filter_pages(list_name, query, page_size, archived)
+            return
+        where, params = sql
+        key = self._sync(list_name, archived)
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT name, headline, checked, mtime_ns, size FROM items"
+                f" WHERE directory = ? AND {where}",
+                (key, *params),
+            ).fetchall()
+        entries = {
+            name: IndexEntry(headline, bool(checked), mtime_ns, size)
+            for name, headline, checked, mtime_ns, size in rows
+        }
+        names = newest_first(list(entries))
+        for start in range(0, len(names), page_size):
+            yield {name: entries[name] for name in names[start : start + page_size]}
+
+
+def open_repository(
+    backend: str,
+    lists_path: str,
+    archives_path: str,
+    templates_path: str,
+    db_path: str,
+) -> Repository:
+    """
+    Summary:
+    Creates the repository for a storage backend.
+
+    Parameters:
+    - backend (str): One of BACKENDS.
+    - lists_path (str): The lists folder.
+    - archives_path (str): The archives folder.
+    - templates_path (str): The templates folder.
+    - db_path (str): The database file of the sqlite backend.
+
+    Returns:
+    A Repository.
+    """
+    if backend == "sqlite":
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            return SQLiteRepository(lists_path, archives_path, templates_path, db_path)
+        except (OSError, sqlite3.Error) as e:
+            logger.error("Could not open %s, using the files only: %s", db_path, e)
+    return Repository(lists_path, archives_path, templates_path)
@@ -0,0 +1,387 @@
+"""Full-text search index over every item of every list and archive.
+
+The index maps lowercase word tokens to the items containing them. It is
+kept on disk as a snapshot plus a journal of changes. It is reconciled with
+the list indexes by sync() once, on first use (and again after a watcher
+rescan), and kept current from the list index events after that.
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import threading
+from bisect import bisect_left
+
+from storage.index import add_listener, get_index, is_item_file
+from storage.loader import load_items
+from storage.log_store import stat_item
+
+SEARCH_DIR = ".search"
+SNAPSHOT_FILENAME = "index.json"
+JOURNAL_FILENAME = "journal.jsonl"
+SEARCH_VERSION = 1
+# The journal is folded into the snapshot once it grows past this.
+MAX_JOURNAL_LINES = 2000
+# Limits how many index terms a single short prefix can expand to.
+MAX_PREFIX_TERMS = 500
+HEADLINE_BOOST = 2
+
+TOKEN_RE = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str) -> list:
+    """Splits a text into lowercase word tokens."""
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def document_terms(item) -> tuple:
+    """
+    Summary:
+    Returns the headline and weighted term counts of an item.
+
+    Parameters:
+    - item (dict): The parsed item yaml.
+
+    Returns:
+    A (headline, {term: weight}) tuple.
+    """
+    if not isinstance(item, dict) or not item:
+        return "", {}
+    terms = {}
+    for position, (key, value) in enumerate(item.items()):
+        if key == "checked" or value is None:
+            continue
+        weight = HEADLINE_BOOST if position == 0 else 1
+        for token in tokenize(value):
+            terms[token] = terms.get(token, 0) + weight
+    return str(next(iter(item.values()))), terms
+
+
+def _document(item, stat) -> list:
+    """Load transform building a document record. Runs in the workers."""
+    headline, terms = document_terms(item)
+    return [headline, stat.st_mtime_ns, stat.st_size, terms]
+
+
+class SearchIndex:
+    """Inverted index of the items below a set of source folders."""
+
+    def __init__(self, root: str, sources: list):
+        self.root = root
+        self.sources = sources
+        self.source_dirs = {os.path.normpath(source) for source in sources}
+        self.folder = os.path.join(root, SEARCH_DIR)
+        self.docs = {}
+        self.postings = {}
+        self.sorted_terms = None
+        self.journal_lines = 0
+        self.loaded = False
+        self.synced = False
+        self.prefixes = {}  # directory -> its key prefix
+        # Change events come from whichever thread wrote the item.
+        self.lock = threading.RLock()
+
+    # persistence
+    def _prefix(self, directory: str) -> str:
+        """Returns the key prefix of the items of a directory, computed once."""
+        prefix = self.prefixes.get(directory)
+        if prefix is None:
+            relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            prefix = self.prefixes[directory] = relative.rstrip("/") + "/"
+        return prefix
+
+    def _key(self, path: str) -> str:
+        directory, name = os.path.split(path)
+        return self._prefix(directory) + name
+
+    def load(self) -> None:
+        """Loads the snapshot and replays the journal."""
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                with open(
+                    os.path.join(self.folder, SNAPSHOT_FILENAME), encoding="utf-8"
+                ) as file:
+                    data = json.load(file)
+                if data.get("version") == SEARCH_VERSION:
+                    for key, doc in data["docs"].items():
+                        self._add(key, doc)
+            except (OSError, ValueError) as e:
+                logger.debug("No search snapshot, it will be built: %s", e)
+
+            try:
+                with open(
+                    os.path.join(self.folder, JOURNAL_FILENAME), encoding="utf-8"
+                ) as file:
+                    for line in file:
+                        try:
+                            self._apply(*json.loads(line))
+                        except ValueError:
+                            break  # torn last line
+                        self.journal_lines += 1
+            except OSError:
+                pass
+
+    def save(self) -> None:
+        """Writes a new snapshot and empties the journal."""
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, SNAPSHOT_FILENAME)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+                json.dump(
+                    {"version": SEARCH_VERSION, "docs": self.docs},
+                    file,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+            os.replace(f"{path}.tmp", path)
+            journal_path = os.path.join(self.folder, JOURNAL_FILENAME)
+            with open(journal_path, "w", encoding="utf-8"):
+                pass
+            self.journal_lines = 0
+
+    def _log(self, *operation) -> None:
+        """Applies an operation and appends it to the journal."""
+        self._apply(*operation)
+        if self.journal_lines >= MAX_JOURNAL_LINES:
+            self.save()
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        with open(
+            os.path.join(self.folder, JOURNAL_FILENAME), "a", encoding="utf-8"
+        ) as file:
+            file.write(json.dumps(operation, ensure_ascii=False) + "\n")
+        self.journal_lines += 1
+
+    # in memory updates
+    def _add(self, key: str, doc: list) -> None:
+        self._remove(key)
+        self.docs[key] = doc
+        for term, weight in doc[3].items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self.sorted_terms = None
+            self.postings[term][key] = weight
+
+    def _remove(self, key: str) -> None:
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        for term in doc[3]:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self.postings[term]
+                self.sorted_terms = None
+
+    def _rename(self, old_prefix: str, new_prefix: str) -> None:
+        for key in [k for k in self.docs if k.startswith(old_prefix)]:
+            self._add(new_prefix + key[len(old_prefix) :], self.docs[key])
+            self._remove(key)
+
+    def _move(self, keys: list, new_prefix: str) -> None:
+        for key in keys:
+            new_key = new_prefix + key.rsplit("/", 1)[-1]
+            if key in self.docs and new_key != key:
+                self._add(new_key, self.docs[key])
+                self._remove(key)
+
+    def _apply(self, operation: str, *args) -> None:
+        if operation == "add":
+            self._add(*args)
+        elif operation == "remove":
+            self._remove(*args)
+        elif operation == "move":
+            self._move(*args)
+        elif operation == "rename":
+            self._rename(*args)
+
+    # change events
+    def _in_sources(self, path: str, depth: int) -> bool:
+        """Whether path lies depth folders below one of the sources."""
+        for _ in range(depth):
+            path = os.path.dirname(os.path.normpath(path))
+        return path in self.source_dirs
+
+    def on_change(self, event: str, path: str, data=None) -> None:
+        """Keeps a loaded index in step with the list index events."""
+        with self.lock:
+            if not self.loaded:
+                return  # sync() catches up when the index is first used
+            depth = 1 if event in ("move", "rename", "forget") else 2
+            if not self._in_sources(path, depth):
+                return
+            if event == "update":
+                try:
+                    stat = stat_item(path)
+                except OSError:
+                    return
+                headline, terms = document_terms(data)
+                doc = [headline, stat.st_mtime_ns, stat.st_size, terms]
+                self._log("add", self._key(path), doc)
+            elif event == "remove":
+                self._log("remove", self._key(path))
+            elif event == "move":
+                # One journal line for the whole batch.
+                keys = [self._key(source) for source in data]
+                keys = [key for key in keys if key in self.docs]
+                if keys:
+                    self._log("move", keys, self._prefix(os.path.normpath(path)))
+            elif event in ("rename", "forget"):
+                old_prefix = self._prefix(os.path.normpath(path))
+                if event == "rename":
+                    new_prefix = self._prefix(os.path.normpath(data))
+                    self._log("rename", old_prefix, new_prefix)
+                else:
+                    for key in [k for k in self.docs if k.startswith(old_prefix)]:
+                        self._log("remove", key)
+
+    def sync(self) -> None:
+        """
+        Summary:
+        Reconciles the index with the list folders, parsing only the items
+        whose mtime or size differ from the indexed ones.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.load()
+            seen = set()
+            changed = False
+            for source in self.sources:
+                if not os.path.isdir(source):
+                    continue
+                for list_name in os.listdir(source):
+                    directory = os.path.join(source, list_name)
+                    if list_name.startswith(".") or not os.path.isdir(directory):
+                        continue
+                    entries = get_index(directory).entries()
+                    prefix = self._prefix(directory)
+                    stale = []
+                    for name, entry in entries.items():
+                        key = prefix + name
+                        seen.add(key)
+                        doc = self.docs.get(key)
+                        if doc is None or doc[1:3] != [entry.mtime_ns, entry.size]:
+                            stale.append(name)
+                    for name, doc in load_items(directory, stale, _document):
+                        if doc is not None and is_item_file(name):
+                            self._add(prefix + name, doc)
+                            changed = True
+
+            for key in self.docs.keys() - seen:
+                self._remove(key)
+                changed = True
+            if changed:
+                self.save()
+            self.synced = True
+
+    def ensure_synced(self) -> None:
+        """Syncs the index if it was not synced since it was loaded."""
+        with self.lock:
+            if not self.synced:
+                self.sync()
+
+    # queries
+    def _expand(self, token: str, prefix: bool) -> list:
+        """Returns the (term, factor) pairs a query token matches."""
+        if not prefix:
+            return [(token, 1.0)] if token in self.postings else []
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(self.postings)
+        terms = []
+        start = bisect_left(self.sorted_terms, token)
+        for term in self.sorted_terms[start : start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            terms.append((term, 1.0 if term == token else 0.5))
+        return terms
+
+    def _token_scores(self, token: str, prefix: bool) -> dict:
+        """Returns the item keys matching a query word, with their scores."""
+        total = len(self.docs) or 1
+        scores = {}
+        for term, factor in self._expand(token, prefix):
+            posting = self.postings[term]
+            idf = math.log(1 + total / len(posting))
+            for key, weight in posting.items():
+                score = factor * idf * (1 + math.log(weight))
+                if score > scores.get(key, 0):
+                    scores[key] = score
+        return scores
+
+    def search(self, query: str, limit: int = 100, prefix: bool = True) -> list:
+        """
+        Summary:
+        Finds the items containing every query word, best matches first.
+
+        Parameters:
+        - query (str): The search text.
+        - limit (int): The maximum number of results.
+        - prefix (bool): Whether words also match longer terms.
+
+        Returns:
+        A list of (item path, headline, score) tuples.
+        """
+        with self.lock:
+            self.load()
+            tokens = tokenize(query)
+            if not tokens:
+                return []
+            scores = None
+            for token in tokens:
+                token_scores = self._token_scores(token, prefix)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {
+                        key: score + token_scores[key]
+                        for key, score in scores.items()
+                        if key in token_scores
+                    }
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+            return [
+                (os.path.join(self.root, key), self.docs[key][0], score)
+                for key, score in ranked[:limit]
+            ]
+
+
+_SEARCH_INDEX = {}
+
+
+def mark_unsynced() -> None:
+    """Makes the next search sync again, e.g. after missed change events."""
+    for index in _SEARCH_INDEX.values():
+        index.synced = False
+
+
+def get_search_index(root: str, sources: list) -> SearchIndex:
+    """
+    Summary:
+    Returns the shared search index of a documents folder, registering it
+    for item change events.
+
+    Parameters:
+    - root (str): The documents folder.
+    - sources (list): The list and archive folders to index.
+
+    Returns:
+    A SearchIndex.
+    """
+    key = os.path.normpath(root)
+    if key not in _SEARCH_INDEX:
+        _SEARCH_INDEX[key] = SearchIndex(root, sources)
+        add_listener(_SEARCH_INDEX[key].on_change)
+    return _SEARCH_INDEX[key]
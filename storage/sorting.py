@@ -0,0 +1,112 @@
+"""Typed sorting for the table view.
+
+Sort keys are normalized once per load using the template field types, and
+the resulting row orders are cached per column and direction, so changing
+the sort is a lookup.
+"""
+
+from functools import lru_cache
+
+from storage.formats import to_date, to_number
+from storage.records import RecordTable
+
+# Key groups: typed values first, then values not matching the declared
+# type (compared as text), then missing values, which always sort last.
+TYPED, TEXT, MISSING = 0, 1, 2
+
+
+@lru_cache(maxsize=64)
+def category_positions(categories: tuple) -> dict:
+    """Returns the template position of each category, stripped, casefolded."""
+    positions = {}
+    for position, category in enumerate(categories):
+        positions.setdefault(str(category).strip().casefold(), position)
+    return positions
+
+
+def sort_key(value, field_type: str, categories=()) -> tuple:
+    """
+    Summary:
+    Returns the normalized sort key of a cell value.
+
+    Parameters:
+    - value: The raw item value.
+    - field_type (str): The template field type.
+    - categories (tuple): The declared categories, in template order.
+
+    Returns:
+    A (group, value) tuple. Keys of the same group compare with each other.
+    """
+    if value is None or value == "":
+        return (MISSING, "")
+    if field_type == "Number":
+        number = to_number(value)
+        if number is not None:
+            return (TYPED, number)
+    elif field_type == "Date":
+        day = to_date(value)
+        if day is not None:
+            return (TYPED, day.toordinal())
+    elif field_type == "Category":
+        # Categories match without case or surrounding spaces.
+        position = category_positions(tuple(categories)).get(
+            str(value).strip().casefold()
+        )
+        if position is not None:
+            return (TYPED, position)
+    elif isinstance(value, bool):
+        return (TYPED, int(value))
+    return (TEXT, str(value).casefold())
+
+
+class SortEngine:
+    """Sorted row orders of a table, computed lazily and cached."""
+
+    def __init__(self, rows: list, fields: dict):
+        """
+        Parameters:
+        - rows (list | RecordTable): The table rows, as dicts or records.
+        - fields (dict): Field name to (field type, categories) pairs.
+        """
+        self.rows = rows
+        self.fields = fields
+        self.keys = {}
+        self.orders = {}
+
+    def column_keys(self, column: str) -> list:
+        """Returns the normalized keys of a column, computing them once."""
+        if column not in self.keys:
+            field_type, categories = self.fields.get(column, ("Text", ()))
+            if isinstance(self.rows, RecordTable):
+                values = self.rows.column(column)
+            else:
+                values = [row.get(column) for row in self.rows]
+            self.keys[column] = [
+                sort_key(value, field_type, categories) for value in values
+            ]
+        return self.keys[column]
+
+    def order(self, column: str, reverse: bool = False) -> list:
+        """
+        Summary:
+        Returns the row indexes sorted by a column.
+
+        Parameters:
+        - column (str): The column to sort by.
+        - reverse (bool): Whether to sort in descending order.
+
+        Returns:
+        A list of row indexes. Values not matching the field type come
+        after the typed ones and missing values always come last.
+        """
+        if (column, reverse) not in self.orders:
+            keys = self.column_keys(column)
+            order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+            # Stable, so groups keep their place whatever the direction.
+            order.sort(key=lambda i: keys[i][0])
+            self.orders[(column, reverse)] = order
+        return self.orders[(column, reverse)]
+
+    def sorted_rows(self, column: str, reverse: bool = False) -> list:
+        """Returns the rows sorted by a column."""
+        return [self.rows[i] for i in self.order(column, reverse)]
@@ -0,0 +1,164 @@
+"""Columnar view model of the table view.
+
+The table keeps its items in a RecordTable, with columns in template field
+order followed by keys only some items have, so every row lines up with
+the header whatever the key order of its file. Hidden columns are dropped
+while parsing and never stored. Rows are handed to the TableView as small
+objects that format their cells only when the view asks for them, which
+RecycleView does for the visible rows only. Filters (see storage.query)
+are evaluated on the stored columns, without reading the files again.
+"""
+
+from functools import partial
+
+from storage.loader import load_items
+from storage.records import ABSENT, RecordTable
+from storage.sorting import SortEngine
+
+
+def format_cell(value) -> str:
+    """Returns the text shown for a cell value."""
+    if value is ABSENT:
+        return ""
+    return str(value)
+
+
+def _project(hidden: frozenset, item, _stat):
+    """Load transform dropping hidden fields. Runs in the workers."""
+    if not isinstance(item, dict):
+        return None
+    return {key: value for key, value in item.items() if key not in hidden}
+
+
+class TableRowData:
+    """A table row as RecycleView data, with a single "cells" key."""
+
+    __slots__ = ("model", "row")
+    KEYS = ("cells",)
+
+    def __init__(self, model, row: int):
+        self.model = model
+        self.row = row
+
+    def __getitem__(self, key: str):
+        if key != "cells":
+            raise KeyError(key)
+        return self.model.format_row(self.row)
+
+    def __contains__(self, key) -> bool:
+        return key == "cells"
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return 1
+
+    def get(self, key: str, default=None):
+        """Returns the formatted cells, or default for any other key."""
+        return self.model.format_row(self.row) if key == "cells" else default
+
+    def keys(self) -> tuple:
+        """Returns the row keys."""
+        return self.KEYS
+
+    def items(self) -> list:
+        """Returns the formatted cells, as RecycleView reads them."""
+        return [("cells", self.model.format_row(self.row))]
+
+
+class TableModel:
+    """The loaded items of a list, sorted and formatted on demand."""
+
+    def __init__(self, fields: dict, hidden=frozenset()):
+        """
+        Parameters:
+        - fields (dict): Field name to (field type, categories) pairs, in
+          template order.
+        - hidden (frozenset): Columns not to load.
+        """
+        self.fields = fields
+        self.hidden = frozenset(hidden)
+        self.records = RecordTable(fields, self.hidden)
+        self.engine = None
+
+    @property
+    def columns(self) -> list:
+        """The shown columns, in template order then first seen order."""
+        return list(self.records.columns)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def load(self, directory: str, entries: dict) -> bool:
+        """
+        Summary:
+        Brings the table up to date with a list directory, parsing only the
+        items changed since the last load.
+
+        Parameters:
+        - directory (str): The list directory.
+        - entries (dict): Its current file name to IndexEntry metadata.
+
+        Returns:
+        Whether anything changed.
+        """
+        records = self.records
+        removed = [name for name in records.names if name not in entries]
+        for name in removed:
+            records.remove(name)
+        stale = [
+            name
+            for name, entry in entries.items()
+            if records.stamp(name) != (entry.mtime_ns, entry.size)
+        ]
+        transform = partial(_project, self.hidden)
+        for name, item in load_items(directory, stale, transform):
+            if item is not None:
+                entry = entries[name]
+                records.set(name, item, (entry.mtime_ns, entry.size))
+        if removed or stale or self.engine is None:
+            self.engine = SortEngine(records, self.fields)
+            return True
+        return False
+
+    def order(self, column: str = None, reverse: bool = False, query=None):
+        """Returns the row indexes in display order, sorted and filtered."""
+        if column is None or column not in self.records.columns:
+            order = range(len(self.records))
+        else:
+            order = self.engine.order(column, reverse)
+        if query is None:
+            return order
+        records = self.records
+        return [
+            row
+            for row in order
+            if query.matches(lambda field, row=row: records.value(row, field))
+        ]
+
+    def format_row(self, row: int) -> list:
+        """Returns the cell texts of a row, one per shown column."""
+        return [
+            format_cell(column.get(row)) for column in self.records.columns.values()
+        ]
+
+    def view_data(self, column: str = None, reverse: bool = False, query=None) -> list:
+        """
+        Summary:
+        Returns the TableView data: the header, then one lazily formatted
+        row per item.
+
+        Parameters:
+        - column (str): The column to sort by, None for load order.
+        - reverse (bool): Whether to sort in descending order.
+        - query (Query): Only show the items matching this filter. Its
+          fields must not be hidden.
+
+        Returns:
+        A list of "cells" mappings.
+        """
+        header = {"cells": [str(column) for column in self.records.columns]}
+        return [header] + [
+            TableRowData(self, row) for row in self.order(column, reverse, query)
+        ]
@@ -0,0 +1,144 @@
+"""List template reading.
+
+Parsed templates are kept in a small LRU cache keyed by path and validated
+by the file mtime, so screens can ask for a template on every entry without
+reading or parsing it again.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from storage import metrics
+from storage.codec import YAMLError, dump_yaml, load_yaml
+
+# Number of parsed templates kept in memory.
+MAX_TEMPLATES = 32
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateField(NamedTuple):
+    """A field declared in a list template."""
+
+    name: str
+    type: str
+    categories: tuple
+
+
+class Template(NamedTuple):
+    """A parsed list template."""
+
+    list_name: str
+    fields: tuple
+    text: str
+
+    def to_dict(self) -> dict:
+        """Returns the template as the mapping stored in its yaml file."""
+        return load_yaml(self.text)
+
+
+def parse_template(text: str) -> Template:
+    """
+    Summary:
+    Parses the yaml text of a list template.
+
+    Parameters:
+    - text (str): The template yaml.
+
+    Returns:
+    A Template. Entries without a field_name are skipped.
+    """
+    data = load_yaml(text)
+    list_name, fields = next(iter(data.items()))
+    return Template(
+        str(list_name),
+        tuple(
+            TemplateField(
+                field["field_name"],
+                field.get("type", "Text"),
+                # Older templates kept the spaces after the commas.
+                tuple(
+                    str(category).strip() for category in field.get("categories") or ()
+                ),
+            )
+            for field in fields or ()
+            if isinstance(field, dict) and "field_name" in field
+        ),
+        text,
+    )
+
+
+class TemplateCache:
+    """LRU cache of parsed templates, validated by file mtime."""
+
+    def __init__(self, size: int = MAX_TEMPLATES):
+        self.size = size
+        self.templates = OrderedDict()  # path -> (mtime_ns, Template)
+        # Used from the UI thread, the I/O worker and the watcher thread.
+        self.lock = threading.RLock()
+
+    def get(self, path: str) -> Template:
+        """Returns the parsed template at path, reading it only if changed."""
+        with self.lock:
+            key = os.path.normpath(path)
+            mtime_ns = os.stat(path).st_mtime_ns
+            cached = self.templates.get(key)
+            if cached is not None and cached[0] == mtime_ns:
+                self.templates.move_to_end(key)
+                return cached[1]
+            with open(path, encoding="utf-8") as file:
+                text = file.read()
+            metrics.count("files_read")
+            metrics.count("bytes_parsed", len(text))
+            template = parse_template(text)
+            self._put(key, mtime_ns, template)
+            return template
+
+    def _put(self, key: str, mtime_ns: int, template: Template) -> None:
+        self.templates[key] = (mtime_ns, template)
+        self.templates.move_to_end(key)
+        while len(self.templates) > self.size:
+            self.templates.popitem(last=False)
+
+    def update(self, path: str, data: dict) -> None:
+        """Caches a template that was just written to path."""
+        with self.lock:
+            try:
+                template = parse_template(dump_yaml(data))
+                self._put(os.path.normpath(path), os.stat(path).st_mtime_ns, template)
+            except (OSError, YAMLError, AttributeError, TypeError, StopIteration):
+                self.invalidate(path)
+
+    def invalidate(self, path: str) -> None:
+        """Drops a cached template."""
+        with self.lock:
+            self.templates.pop(os.path.normpath(path), None)
+
+
+TEMPLATES = TemplateCache()
+
+
+def read_template(template_path: str) -> Template:
+    """Returns the parsed template at template_path, using the cache."""
+    return TEMPLATES.get(template_path)
+
+
+def read_template_fields(template_path: str) -> tuple:
+    """
+    Summary:
+    Returns the field definitions declared in a list template.
+
+    Parameters:
+    - template_path (str): The template yaml path.
+
+    Returns:
+    A tuple of TemplateField, empty if the template can't be read.
+    """
+    try:
+        return TEMPLATES.get(template_path).fields
+    except (OSError, YAMLError, AttributeError, TypeError, StopIteration) as e:
+        logger.warning("Could not read template %s: %s", template_path, e)
+        return ()
@@ -0,0 +1,279 @@
+"""Filesystem change watcher.
+
+Watches root folders (lists, archives, templates) and the folders directly
+below them, and reports batches of ("added" | "modified" | "deleted", path)
+events. On Linux (and Android) it uses inotify through ctypes; elsewhere,
+or if inotify is unavailable, it polls the folder mtimes and lists only the
+folders that changed. A ("rescan", root) event means changes were lost and
+everything below root should be reloaded.
+
+apply_events() brings the list indexes in step with a batch of events, which
+also notifies the search index and other index listeners.
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+
+from storage.index import forget_directory, reload_items
+from storage.search import mark_unsynced
+from storage.templates import TEMPLATES
+
+# Seconds to wait for more events before reporting a batch.
+BATCH_DELAY = 0.2
+POLL_INTERVAL = 2.0
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")
+
+logger = logging.getLogger(__name__)
+
+
+def _watched(name: str) -> bool:
+    """Skips hidden files: indexes, logs, temporary files."""
+    return not name.startswith(".")
+
+
+class InotifyBackend:
+    """Blocking inotify reader for a set of folders."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.add_watch_fn = libc.inotify_add_watch
+        self.add_watch_fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # watch descriptor -> folder
+
+    def add_watch(self, directory: str) -> None:
+        """Watches a folder."""
+        wd = self.add_watch_fn(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+        self.watches[wd] = directory
+
+    def read(self, timeout: float) -> list:
+        """Returns the (kind, path, is_dir) events read within timeout."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + EVENT.size <= len(data):
+            wd, mask, _cookie, length = EVENT.unpack_from(data, pos)
+            name = data[pos + EVENT.size : pos + EVENT.size + length].rstrip(b"\0")
+            pos += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.extend(("rescan", root, True) for root in self.watches.values())
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append(("deleted", path, is_dir))
+            elif mask & IN_MOVED_TO or (mask & IN_CREATE and is_dir):
+                events.append(("added", path, is_dir))
+            elif mask & IN_CLOSE_WRITE:
+                events.append(("modified", path, is_dir))
+        return events
+
+    def close(self) -> None:
+        """Closes the inotify descriptor."""
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Finds changes by comparing folder mtimes, then folder listings."""
+
+    def __init__(self, interval: float = POLL_INTERVAL):
+        self.interval = interval
+        self.folders = {}  # folder -> (mtime_ns, {name: (mtime_ns, size, is_dir)})
+
+    @staticmethod
+    def _list(directory: str) -> dict:
+        listing = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if _watched(entry.name):
+                    stat = entry.stat()
+                    listing[entry.name] = (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                        entry.is_dir(),
+                    )
+        return listing
+
+    def add_watch(self, directory: str) -> None:
+        """Watches a folder."""
+        self.folders[directory] = (
+            os.stat(directory).st_mtime_ns,
+            self._list(directory),
+        )
+
+    def read(self, timeout: float) -> list:
+        """Returns the (kind, path, is_dir) events found after timeout."""
+        time.sleep(max(timeout, self.interval))
+        events = []
+        for directory, (mtime_ns, listing) in list(self.folders.items()):
+            try:
+                new_mtime_ns = os.stat(directory).st_mtime_ns
+                if new_mtime_ns == mtime_ns:
+                    continue
+                new_listing = self._list(directory)
+            except OSError:
+                del self.folders[directory]
+                continue
+            self.folders[directory] = (new_mtime_ns, new_listing)
+            for name in listing.keys() - new_listing.keys():
+                events.append(("deleted", os.path.join(directory, name), listing[name][2]))
+            for name, (mtime, size, is_dir) in new_listing.items():
+                old = listing.get(name)
+                if old is None:
+                    events.append(("added", os.path.join(directory, name), is_dir))
+                elif not is_dir and old[:2] != (mtime, size):
+                    events.append(("modified", os.path.join(directory, name), is_dir))
+        return events
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class Watcher:
+    """Background thread reporting file changes below a set of roots."""
+
+    def __init__(self, roots: list, callback, polling: bool = False):
+        """
+        Parameters:
+        - roots (list): The folders to watch, with their direct subfolders.
+        - callback (fn): Called with each batch of (kind, path) events, on
+          the watcher thread.
+        - polling (bool): Whether to poll even where inotify is available.
+        """
+        self.roots = roots
+        self.callback = callback
+        self.backend = None
+        if not polling and sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyBackend()
+            except (OSError, AttributeError) as e:
+                logger.debug("inotify unavailable, polling instead: %s", e)
+        if self.backend is None:
+            self.backend = PollingBackend()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="lister-watcher", daemon=True)
+
+    def _watch_tree(self, root: str) -> None:
+        self.backend.add_watch(root)
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if _watched(name) and os.path.isdir(path):
+                self.backend.add_watch(path)
+
+    def start(self) -> None:
+        """Starts watching."""
+        for root in self.roots:
+            try:
+                self._watch_tree(root)
+            except OSError as e:
+                logger.warning("Cannot watch %s: %s", root, e)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stops watching."""
+        self.stopped.set()
+
+    def _run(self) -> None:
+        roots = {os.path.normpath(root) for root in self.roots}
+        while not self.stopped.is_set():
+            raw = self.backend.read(1.0)
+            if not raw:
+                continue
+            # Collect what follows shortly, e.g. the rest of a sync.
+            while True:
+                more = self.backend.read(BATCH_DELAY)
+                if not more:
+                    break
+                raw.extend(more)
+
+            events = []
+            for kind, path, is_dir in raw:
+                if not _watched(os.path.basename(path)) and kind != "rescan":
+                    continue
+                if kind == "added" and is_dir:
+                    if os.path.normpath(os.path.dirname(path)) in roots:
+                        try:
+                            self.backend.add_watch(path)
+                        except OSError as e:
+                            logger.warning("Cannot watch %s: %s", path, e)
+                events.append((kind, path))
+            if events:
+                try:
+                    self.callback(events)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logger.error("Watcher callback failed: %s", e)
+        self.backend.close()
+
+
+def apply_events(events: list, item_roots: list) -> list:
+    """
+    Summary:
+    Updates the list indexes and the template cache for a batch of watcher
+    events. Items whose indexed mtime and size already match, e.g. written
+    by the app itself, are left out.
+
+    Parameters:
+    - events (list): (kind, path) tuples from a Watcher.
+    - item_roots (list): The folders holding list folders (lists, archives).
+
+    Returns:
+    The events that changed something, plus list folder and rescan events.
+    """
+    roots = {os.path.normpath(root) for root in item_roots}
+    changed = []
+    by_directory = {}
+    for kind, path in events:
+        directory, name = os.path.split(path)
+        if kind == "rescan" or os.path.normpath(directory) in roots:
+            if kind == "deleted":
+                forget_directory(path)
+            elif kind == "rescan":
+                # Events were missed, so the search index needs a full sync.
+                mark_unsynced()
+            changed.append((kind, path))
+        elif os.path.normpath(os.path.dirname(directory)) in roots:
+            by_directory.setdefault(directory, {})[name] = kind
+        else:
+            TEMPLATES.invalidate(path)
+            changed.append((kind, path))
+
+    for directory, kinds in by_directory.items():
+        for path in reload_items(directory, list(kinds)):
+            kind = kinds[os.path.basename(path)]
+            if os.path.exists(path):
+                if kind == "deleted":
+                    kind = "modified"  # deleted and written again
+            else:
+                kind = "deleted"
+            changed.append((kind, path))
+    return changed
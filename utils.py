@@ -1,22 +1,13 @@
 """Helper and utility functions."""
 
 import os
-import time
-import logging
-from datetime import datetime
-
-import yaml
 
 from kivy.utils import platform
 
 from kivymd.app import MDApp
-from kivymd.uix.list import MDList
-from kivymd.uix.dialog import MDDialog
-from kivymd.uix.textfield import MDTextField
-from kivymd.uix.selectioncontrol import MDCheckbox
 
-from components.dialogs import SearchDialog
-from components.forms import NewItemForm
+from storage.listing import newest_first
+from storage.repository import read_yaml, write_yaml
 
 # File storage paths
 if platform == "android":
@@ -33,21 +24,7 @@ TEMPLATE_PATH = os.path.join(DOCUMENTS_PATH, "templates/")
 EXPORTS_PATH = os.path.join(DOCUMENTS_PATH, "exports/")
 ASSETS_PATH = os.path.join("assets/")
 ARCHIVES_PATH = os.path.join(DOCUMENTS_PATH, "archives/")
-
-
-# logging
-def log_runtime(func):
-    """Prints our the function runtime."""
-
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        runtime = end_time - start_time
-        logging.info("Function %s executed in %s seconds", func.__name__, runtime)
-        return result
-
-    return wrapper
+FILTERS_PATH = os.path.join(DOCUMENTS_PATH, ".filters.yaml")
 
 
 # Screen operations
@@ -68,6 +45,34 @@ def get_screen_element(screen: str, element_id: str):
     return screen.ids[element_id]
 
 
+def get_repository():
+    """Returns the app repository of lists, items and templates."""
+    return MDApp.get_running_app().repository
+
+
+def run_io(fn, *args, on_done=None, on_error=None, coalesce_key=None):
+    """
+    Summary:
+    Runs a file operation on the background I/O worker.
+
+    Parameters:
+    - fn (fn): The operation, called with args.
+    - on_done (fn): Called with the result on the UI thread.
+    - on_error (fn): Called with the exception on the UI thread.
+    - coalesce_key: If given, a newer operation with the same key submitted
+      within the coalescing window replaces this one.
+
+    Returns:
+    A Future of the result, or None for coalesced operations.
+    """
+    executor = MDApp.get_running_app().io_executor
+    if coalesce_key is not None:
+        return executor.submit_coalesced(
+            coalesce_key, fn, *args, on_done=on_done, on_error=on_error
+        )
+    return executor.submit(fn, *args, on_done=on_done, on_error=on_error)
+
+
 def change_screen(screen: str) -> None:
     """
     Summary:
@@ -86,15 +91,8 @@ def change_screen(screen: str) -> None:
 
 # yaml files operations
 def sort_files_by_datetime(file_paths):
-    """Sort the yaml files by date suffix."""
-
-    def extract_datetime(file_path):
-        filename = os.path.basename(file_path)
-        date_string = filename.split("_")[-1].split(".")[0]
-        return datetime.strptime(date_string, "%Y-%m-%d %H%M%S")
-
-    sorted_file_paths = sorted(file_paths, key=extract_datetime, reverse=True)
-    return sorted_file_paths
+    """Sort the yaml files by date suffix, newest first."""
+    return newest_first(file_paths)
 
 
 def open_yaml_file(path: str) -> dict:
@@ -108,14 +106,14 @@ def open_yaml_file(path: str) -> dict:
     Returns:
     A python dict.
     """
-    with open(path, encoding="utf-8") as file:
-        return yaml.safe_load(file)
+    return read_yaml(path)
 
 
 def save_to_yaml(path, my_dict) -> None:
     """
     Summary:
-    Writes a yaml file from a python dict.
+    Writes a yaml file from a python dict. Items of lists using a single
+    file log are appended to the log instead.
 
     Parameters:
     - path (str): A file path.
@@ -124,26 +122,10 @@ def save_to_yaml(path, my_dict) -> None:
     Returns:
     None
     """
-    with open(path, "w", encoding="utf-8") as file:
-        yaml.dump(my_dict, file, default_flow_style=False, sort_keys=False)
-        print(f"YAML item '{path}' has been created successfully.")
+    write_yaml(path, my_dict)
 
 
-def get_folder_list(folder: str) -> list:
-    """
-    Summary:
-    Returns a list of folders in the 'lists' directory.
-
-    Parameters:
-    - folder (str): A folder path.
-
-    Returns:
-    A list a folder names.
-    """
-    return list(os.listdir(folder))
-
-
-def list_items_to_dict(all_list_items: MDList) -> dict:
+def list_items_to_dict(all_list_items) -> dict:
     """
     Summary:
     Returns a dict from an MDList object.
@@ -154,6 +136,13 @@ def list_items_to_dict(all_list_items: MDList) -> dict:
     Returns:
     A dict of MDList items titles.
     """
+    # Widgets are imported on first use, to keep them out of app startup.
+    # pylint: disable=C0415
+    from kivymd.uix.selectioncontrol import MDCheckbox
+    from kivymd.uix.textfield import MDTextField
+
+    from components.forms import NewItemForm
+
     mapped_values = {}
     for item in all_list_items:
         if isinstance(item, NewItemForm):
@@ -173,7 +162,19 @@ def list_items_to_dict(all_list_items: MDList) -> dict:
 
 
 # Dialog operations
-def create_dialog(_content, _cancel_fn, _callback_fn) -> MDDialog:
+def error_dialog(message: str):
+    """Returns an on_error callback showing message and the error."""
+
+    def show(error):
+        # pylint: disable=C0415
+        from kivymd.uix.dialog import MDDialog, MDDialogSupportingText
+
+        MDDialog(MDDialogSupportingText(text=f"{message}: {error}")).open()
+
+    return show
+
+
+def create_dialog(_content, _cancel_fn, _callback_fn):
     """
     Summary:
     Returns an MDDialog.
@@ -186,4 +187,7 @@ def create_dialog(_content, _cancel_fn, _callback_fn) -> MDDialog:
     Returns:
     An MDDialog
     """
+    # pylint: disable=C0415
+    from components.dialogs import SearchDialog
+
     return SearchDialog